@@ -68,14 +68,14 @@ class Transform:
         """
         # Make sure inputs are np.ndarray with right shape
         if isinstance(location, np.ndarray):
-            location = location.reshape((-1)).astype(np.float)
+            location = location.reshape((-1)).astype(np.float64)
         else:
-            location = np.array(location, dtype=np.float)
+            location = np.array(location, dtype=np.float64)
 
         if isinstance(orientation, np.ndarray):
-            orientation = orientation.reshape((-1)).astype(np.float)
+            orientation = orientation.reshape((-1)).astype(np.float64)
         else:
-            orientation = np.array(orientation, dtype=np.float)
+            orientation = np.array(orientation, dtype=np.float64)
 
         carla_location = carla.Location(x=location[0],
                                         y=-location[1],
@@ -254,7 +254,7 @@ class Transform:
         """ Helper method to create homogeneous transform matrix _tform_w2e. """
         if self._rotm_w2e is None:
             self._init_rotm_w2e()
-        self._tform_w2e = np.zeros((4, 4), dtype=np.float)
+        self._tform_w2e = np.zeros((4, 4), dtype=np.float64)
         self._tform_w2e[3, 3] = 1
         self._tform_w2e[0:3, 0:3] = self._rotm_w2e
         trvec = np.array([self._carla_tform.location.x,
@@ -278,7 +278,7 @@ class Transform:
         """ Helper method to create homogeneous transform matrix _tform_e2w. """
         if self._rotm_e2w is None:
             self._init_rotm_e2w()
-        self._tform_e2w = np.zeros((4, 4), dtype=np.float)
+        self._tform_e2w = np.zeros((4, 4), dtype=np.float64)
         self._tform_e2w[3, 3] = 1
         self._tform_e2w[0:3, 0:3] = self._rotm_e2w
         self._tform_e2w[0:3, 3] = np.array([self._carla_tform.location.x,
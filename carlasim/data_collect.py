@@ -8,7 +8,7 @@ import os
 import sys
 import re
 import random
-import queue
+import threading
 from collections import deque
 
 import numpy as np
@@ -68,15 +68,18 @@ class Geo2Location(object):
         l = np.array([[loc1.x, loc2.x, loc3.x, loc4.x],
                       [loc1.y, loc2.y, loc3.y, loc4.y],
                       [loc1.z, loc2.z, loc3.z, loc4.z],
-                      [1, 1, 1, 1]], dtype=np.float)
+                      [1, 1, 1, 1]], dtype=np.float64)
         g = np.array([[geoloc1.latitude, geoloc2.latitude, geoloc3.latitude, geoloc4.latitude],
                       [geoloc1.longitude, geoloc2.longitude,
                           geoloc3.longitude, geoloc4.longitude],
                       [geoloc1.altitude, geoloc2.altitude,
                           geoloc3.altitude, geoloc4.altitude],
-                      [1, 1, 1, 1]], dtype=np.float)
+                      [1, 1, 1, 1]], dtype=np.float64)
         # Tform = (G*L^-1)^-1
-        self._tform = np.linalg.inv(g.dot(np.linalg.inv(l)))
+        self._tform = np.ascontiguousarray(
+            np.linalg.inv(g.dot(np.linalg.inv(l))), dtype=np.float64)
+        # Scratch buffer of homogeneous geolocation reused by transform()
+        self._scratch = np.empty(4)
 
     def transform(self, geolocation):
         """
@@ -84,9 +87,12 @@ class Geo2Location(object):
 
         Numerical error may exist. Experiments show error is about under 1 cm in Town03.
         """
-        geoloc = np.array(
-            [geolocation.latitude, geolocation.longitude, geolocation.altitude, 1])
-        loc = self._tform.dot(geoloc.T)
+        s = self._scratch
+        s[0] = geolocation.latitude
+        s[1] = geolocation.longitude
+        s[2] = geolocation.altitude
+        s[3] = 1.0
+        loc = self._tform.dot(s)
         return carla.Location(loc[0], loc[1], loc[2])
 
     def get_matrix(self):
@@ -96,6 +102,39 @@ class Geo2Location(object):
 # %% ================= Sensor Base =================
 
 
+class _Slot(object):
+    """
+    Single-slot buffer used in place of queue.Queue for sensor data.
+
+    In synchronous mode each sensor produces exactly one piece of data per tick, which is
+    consumed exactly once per tick, so a single slot guarded by a Condition is sufficient
+    and avoids the bookkeeping of queue.Queue. A put() before the previous data is consumed
+    overwrites it. The slot is read and marked empty under the same lock as put(),
+    so data put while the consumer is waking up is never lost.
+    """
+
+    def __init__(self):
+        """ Constructor method """
+        self._data = None
+        self._has_data = False
+        self._cond = threading.Condition()
+
+    def put(self, data):
+        """ Store data and wake up the consumer. """
+        with self._cond:
+            self._data = data
+            self._has_data = True
+            self._cond.notify()
+
+    def get(self):
+        """ Block until data is available and return it. """
+        with self._cond:
+            while not self._has_data:
+                self._cond.wait()
+            self._has_data = False
+            return self._data
+
+
 class CarlaSensor(object):
     """ Base class for sensors provided by carla. """
 
@@ -118,7 +157,8 @@ class CarlaSensor(object):
         # The callback will likely not finish before data get accessed from the main loop, causing inconsistent data.
         # Here the queue is expected to be used in listen() instead. The callback simply puts the sensor data into the queue,
         # then the data can be obtained in update() using get() which blocks and make sure synchronization.
-        self._queue = queue.Queue()
+        # A single-slot buffer is enough since there is one put() and one get() per tick.
+        self._queue = _Slot()
 
     def update(self):
         """ Wait for sensro event to be put in queue and update data. """
@@ -480,14 +520,16 @@ class World(object):
                 self.ego_veh = self.carla_world.try_spawn_actor(
                     ego_veh_bp, spawn_point)
 
+        # Spawn points are queried from the server only once and reused for retries
+        spawn_points = None
         while self.ego_veh is None:
-            if not self.map.get_spawn_points():
+            if spawn_points is None:
+                spawn_points = self.map.get_spawn_points()
+            if not spawn_points:
                 print('There are no spawn points available in your map/town.')
                 sys.exit(1)
             print("Spawning new ego vehicle at a random point.")
-            spawn_points = self.map.get_spawn_points()
-            spawn_point = random.choice(
-                spawn_points) if spawn_points else carla.Transform()
+            spawn_point = random.choice(spawn_points)
             self.ego_veh = self.carla_world.try_spawn_actor(
                 ego_veh_bp, spawn_point)
 
@@ -7,6 +7,9 @@ import numpy as np
 
 from carlasim.utils import TrafficSignType, LaneMarkingType, LaneMarkingColor
 
+# All traffic sign types as a list, so it is not rebuilt for every perturbation
+_TRAFFIC_SIGN_TYPES = list(TrafficSignType)
+
 
 class Pole(object):
     """
@@ -37,8 +40,9 @@ class Pole(object):
         """
         if random.random() < fc_prob:
             while True:
-                wrong_type = random.choice(list(TrafficSignType))
-                if wrong_type != self.type and wrong_type != TrafficSignType.RSStop:
+                wrong_type = random.choice(_TRAFFIC_SIGN_TYPES)
+                # Enum members are singletons, so identity checks suffice
+                if wrong_type is not self.type and wrong_type is not TrafficSignType.RSStop:
                     self.type = wrong_type
                     break
 
@@ -199,12 +203,8 @@ class MELaneMarking(object):
         Returns:
             y: The corresponding y coordinate(s) along the lane marking detection.
         """
-        x = np.asarray(x)
-        coeffs = np.asarray(self.coeffs)
-        y = np.zeros(x.shape)
-        for idx, coeff in enumerate(reversed(coeffs)):
-            y += coeff * x**idx
-        return y
+        # Coefficients are in descending order, which is what np.polyval() expects
+        return np.polyval(self.coeffs, np.asarray(x, dtype=np.float64))
 
 
 class MELaneDetection(object):
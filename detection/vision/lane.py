@@ -241,8 +241,8 @@ class LaneMarkingDetector(object):
             right_coords = rotm @ right_coords
 
         # Map from pixels to meters
-        left_coords_fbumper = left_coords.astype(np.float)
-        right_coords_fbumper = right_coords.astype(np.float)
+        left_coords_fbumper = left_coords.astype(np.float64)
+        right_coords_fbumper = right_coords.astype(np.float64)
         left_coords_fbumper[0, :] = left_coords_fbumper[0, :] / self.px_per_meters_x
         left_coords_fbumper[1, :] = left_coords_fbumper[1, :] / self.px_per_meters_y
         right_coords_fbumper[0, :] = right_coords_fbumper[0, :] / self.px_per_meters_x
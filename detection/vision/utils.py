@@ -27,6 +27,27 @@ def convert_semantic_color(ss_image):
     return converted
 
 
+def extract_lane_pole_masks(ss_image, lane_out=None, pole_out=None):
+    """
+    Extract lane and pole masks from a semantic segmentation image.
+
+    The comparisons write into boolean buffers directly and the masks are returned as
+    uint8 views of them, so no extra casting pass over the image is needed.
+
+    Input:
+        ss_image: Numpy.array of uint8 semantic tags, e.g. the R channel of Carla's semantic image.
+        lane_out: Optional bool array of the same shape to write the lane mask into.
+        pole_out: Optional bool array of the same shape to write the pole mask into.
+    Output:
+        lane_image: Numpy.array of uint8 with 1 where the tag is 6 (road line) or 8 (sidewalk).
+        pole_image: Numpy.array of uint8 with 1 where the tag is 5 (pole).
+    """
+    lane_out = np.equal(ss_image, 6, out=lane_out)
+    lane_out |= ss_image == 8
+    pole_out = np.equal(ss_image, 5, out=pole_out)
+    return lane_out.view(np.uint8), pole_out.view(np.uint8)
+
+
 def decode_depth(depth_buffer):
     """
     Decode the depth buffer into a depth image.
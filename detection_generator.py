@@ -13,7 +13,7 @@ import matplotlib.pyplot as plt
 
 from detection.vision.lane import LaneMarkingDetector
 from detection.vision.pole import PoleDetector
-from detection.vision.utils import decode_depth
+from detection.vision.utils import decode_depth, extract_lane_pole_masks
 from detection.rs_stop import RSStopDetectionSimulator
 from detection.utils import Pole, MELaneMarking, MELaneMarkingType, MELaneDetection
 from detection.pole_map import gen_pole_map
@@ -141,11 +141,20 @@ def main():
     lane_marking_detection_seq = []
     rs_stop_detecion_seq = []
 
+    # Buffers of lane and pole masks
+    # They are allocated at the first step and overwritten at every step afterwards,
+    # which is fine since detectors do not keep references to the images.
+    lane_mask_buffer = None
+    pole_mask_buffer = None
+
     # Loop over recorded data
     for image_idx, (ss_image, depth_buffer) in enumerate(zip(ss_images, depth_buffers)):
         # Retrieve data at current step
-        pole_image = (ss_image == 5).astype(np.uint8)
-        lane_image = (ss_image == 6) | (ss_image == 8).astype(np.uint8)
+        if lane_mask_buffer is None:
+            lane_mask_buffer = np.empty(ss_image.shape, dtype=bool)
+            pole_mask_buffer = np.empty(ss_image.shape, dtype=bool)
+        lane_image, pole_image = extract_lane_pole_masks(
+            ss_image, lane_mask_buffer, pole_mask_buffer)
         depth_image = decode_depth(depth_buffer)
         # The pose of rear axle at current step
         raxle_location = raxle_locations[image_idx]
@@ -1,11 +1,26 @@
 """This script runs error box plots for specified tests."""
 # %% Imports
 import os
+import sys
 import argparse
 import pickle
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 import yaml
+# Use libyaml's C loader if available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 import numpy as np
+import matplotlib
+# Render without GUI if BATCH_MODE=1 is set or there is no X display on Linux
+# macOS and Windows never set DISPLAY, so it is only checked on Linux
+BATCH_MODE = (os.environ.get('BATCH_MODE', '0') == '1'
+              or (sys.platform.startswith('linux') and not os.environ.get('DISPLAY')))
+if BATCH_MODE:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 
 from carlasim.utils import TrafficSignType
@@ -13,33 +28,92 @@ import localization.eval.utils as evtools
 
 
 # %% ############### Set matplotlib's format ###############
-plt.rc('text', usetex=True)
+# LaTeX rendering is slow, so it is only used when USE_TEX=1 is set, e.g. for publication figures
+if os.environ.get('USE_TEX', '0') == '1':
+    plt.rc('text', usetex=True)
+    params = {'text.latex.preamble' : r'\usepackage{siunitx} \usepackage{amsmath}'}
+    plt.rcParams.update(params)
 plt.rc('font', family='serif', size=12)
-params = {'text.latex.preamble' : r'\usepackage{siunitx} \usepackage{amsmath}'}
-plt.rcParams.update(params)
 
 # %%
 
 
+@functools.lru_cache(maxsize=128)
 def remove_prefix(text, prefix):
     if text.startswith(prefix):
         return text[len(prefix):]
     return text
 
 
+def shorten_config_file_name(file_name, prefix):
+    """
+    Strip the .yaml extension and the prefix from a config file name.
+
+    Config file names are flat, so simple slicing is used instead of os.path.splitext().
+    """
+    if file_name.endswith('.yaml'):
+        file_name = file_name[:-len('.yaml')]
+    return remove_prefix(file_name, prefix)
+
+
 def get_subdir_names(directory):
     """
-    # Ref: https://stackoverflow.com/questions/973473/getting-a-list-of-all-subdirectories-in-the-current-directory
+    Get names of subdirectories in the given directory.
+
+    os.scandir() uses the entry types cached when listing the directory,
+    so no extra stat call is needed except for symlinks.
     """
-    return next(os.walk(directory))[1]
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.is_dir()]
+
+
+def load_errors(result_dir):
+    """
+    Load errors and CPU times of a localization result.
+
+    Only the arrays in RESULT_KEYS are used from results.pkl. They are cached in errs.npz
+    next to results.pkl, and the cache is loaded instead if it is newer than results.pkl.
+    """
+    path_to_result_file = os.path.join(result_dir, 'results.pkl')
+    path_to_cache_file = os.path.join(result_dir, 'errs.npz')
+    if os.path.exists(path_to_cache_file) and \
+            os.path.getmtime(path_to_cache_file) >= os.path.getmtime(path_to_result_file):
+        with np.load(path_to_cache_file) as cache:
+            return {key: cache[key] for key in RESULT_KEYS}
+
+    # A large read buffer lets pickle consume whole frames at once
+    with open(path_to_result_file, 'rb', buffering=1 << 20) as f:
+        localization_results = pickle.load(f)
+    results = {key: np.asarray(localization_results[key]) for key in RESULT_KEYS}
+    np.savez(path_to_cache_file, **results)
+    return results
+
+
+def is_combined_file_up_to_date(path_to_combined_file, result_dirs):
+    """
+    Check if the combined results file can be reused.
+
+    It must be newer than all results.pkl files and be made from exactly the given result dirs,
+    which are stored in it under the key 'result_dirs'.
+    """
+    if not os.path.exists(path_to_combined_file):
+        return False
+    if os.path.getmtime(path_to_combined_file) < max(
+            os.path.getmtime(os.path.join(result_dir, 'results.pkl')) for result_dir in result_dirs):
+        return False
+    # Arrays in an npz file are read lazily, so only the list of result dirs is loaded here
+    with np.load(path_to_combined_file) as combined:
+        return 'result_dirs' in combined.files and combined['result_dirs'].tolist() == result_dirs
 
 
 def set_box_color(bp, color):
-    plt.setp(bp['boxes'], color=color)
-    plt.setp(bp['whiskers'], color=color)
-    plt.setp(bp['caps'], color=color)
-    plt.setp(bp['medians'], color=color)
+    plt.setp(bp['boxes'] + bp['whiskers'] + bp['caps'] + bp['medians'],
+             color=color)
+
 
+# Keys of results used in this script
+ERR_KEYS = ['lon_errs', 'lat_errs', 'yaw_errs']
+RESULT_KEYS = ERR_KEYS + ['cpu_times']
 
 # %%  ############### Set directories manually ###############
 RECORDING_NAME = 'urban'
@@ -58,13 +132,15 @@ print('Test Name: {}'.format(TEST_NAME))
 path_to_config = os.path.join(recording_dir,
                               'settings/config.yaml')
 with open(path_to_config, 'r') as f:
-    carla_config = yaml.safe_load(f)
+    carla_config = yaml.load(f, Loader=SafeLoader)
 
 # %% ############### Load results with same noise level ###############
 # Get all noise level subdirectories under the test folder
 noise_configs = get_subdir_names(test_dir)
 
 results_in_all_tests = {}
+# List of (shorten noise level name, shorten sw config name, result dir)
+result_dirs = []
 # Loop over noise levels
 for noise_config in noise_configs:
     # Create a dict for this noise level
@@ -76,69 +152,115 @@ for noise_config in noise_configs:
     sw_configs = get_subdir_names(noise_level_dir)
     # Loop over sw configs
     for sw_config in sw_configs:
-        result_dir = os.path.join(noise_level_dir, sw_config)
-        path_to_result_file = os.path.join(result_dir,
-                                           'results.pkl')
-        with open(path_to_result_file, 'rb') as f:
-            localization_results = pickle.load(f)
-
         shorten_config_name = remove_prefix(sw_config, 'sw_')
-        results_in_all_tests[shorten_noise_level_name][shorten_config_name] = localization_results
+        result_dirs.append((shorten_noise_level_name,
+                            shorten_config_name,
+                            os.path.join(noise_level_dir, sw_config)))
+
+if not result_dirs:
+    sys.exit('No results found in {}'.format(test_dir))
+
+# Results of all configs are combined into one file under the test folder,
+# which is loaded at once as long as it is up to date with the results found above.
+# Keys are in the form of '<noise config>__<sw config>__<result key>'.
+path_to_combined_file = os.path.join(test_dir, 'combined.npz')
+# Sorted since subdirectories are listed in arbitrary order
+result_dir_paths = sorted(result_dir for _, _, result_dir in result_dirs)
+if is_combined_file_up_to_date(path_to_combined_file, result_dir_paths):
+    with np.load(path_to_combined_file) as combined:
+        for shorten_noise_level_name, shorten_config_name, _ in result_dirs:
+            results_in_all_tests[shorten_noise_level_name][shorten_config_name] = {
+                key: combined['{}__{}__{}'.format(shorten_noise_level_name, shorten_config_name, key)]
+                for key in RESULT_KEYS}
+else:
+    # Loading is mostly I/O, so results are loaded by a thread pool to overlap file reads
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        all_results = executor.map(load_errors,
+                                   [result_dir for _, _, result_dir in result_dirs])
+        for (shorten_noise_level_name, shorten_config_name, _), localization_results in zip(result_dirs, all_results):
+            results_in_all_tests[shorten_noise_level_name][shorten_config_name] = localization_results
+
+    combined = {'{}__{}__{}'.format(noise_level_name, config_name, key): results[key]
+                for noise_level_name, results_of_noise_level in results_in_all_tests.items()
+                for config_name, results in results_of_noise_level.items()
+                for key in RESULT_KEYS}
+    np.savez(path_to_combined_file, result_dirs=np.array(result_dir_paths), **combined)
 
 # %% ############### Evaluate errors across all configs ###############
 
 # Use the order of configs defined in scenarios.yaml
 with open('settings/tests/scenarios.yaml', 'r') as f:
-    scenarios = yaml.safe_load(f)
+    scenarios = yaml.load(f, Loader=SafeLoader)
 
 noise_config_file_names = scenarios[TEST_NAME][RECORDING_NAME]['noise_configs']
 sw_config_file_names = scenarios[TEST_NAME][RECORDING_NAME]['sw_configs']
 
+noise_config_names = [shorten_config_file_name(file_name, 'n_')
+                      for file_name in noise_config_file_names]
+sw_config_names = [shorten_config_file_name(file_name, 'sw_')
+                   for file_name in sw_config_file_names]
+
+# Stack errors of all configs into one array padded with NaNs,
+# so the statistics of all configs are computed at once.
+# Axes: noise config, sw config, error type (lon, lat, yaw), data point
+# Single precision is more than enough for errors in meters and radians.
+num_data_points = np.zeros((len(noise_config_names), len(sw_config_names)), dtype=int)
+for i, noise_config in enumerate(noise_config_names):
+    for j, sw_config in enumerate(sw_config_names):
+        num_data_points[i, j] = len(
+            results_in_all_tests[noise_config][sw_config]['lon_errs'])
+
+abs_errs = np.full((len(noise_config_names), len(sw_config_names),
+                    len(ERR_KEYS), num_data_points.max()), np.nan, dtype=np.float32)
+for i, noise_config in enumerate(noise_config_names):
+    for j, sw_config in enumerate(sw_config_names):
+        results = results_in_all_tests[noise_config][sw_config]
+        for k, err_key in enumerate(ERR_KEYS):
+            # Copy and take absolute values in one pass
+            np.abs(results[err_key], out=abs_errs[i, j, k, :num_data_points[i, j]])
+# Sort errors once. NaN padding is sorted to the end.
+# Medians are then read from the middle of the sorted errors, and box plots use the sorted errors as well.
+abs_errs.sort(axis=-1)
+# Masked sums skip the padding without making a NaN-free copy as nanmean() does
+valid = np.arange(abs_errs.shape[-1]) < num_data_points[:, :, np.newaxis, np.newaxis]
+mean_abs_errs = np.sum(abs_errs, axis=-1, where=valid) \
+    / num_data_points[:, :, np.newaxis]
+mid_idc = (num_data_points // 2)[:, :, np.newaxis, np.newaxis]
+upper_mids = np.take_along_axis(abs_errs, mid_idc, axis=-1)[..., 0]
+lower_mids = np.take_along_axis(abs_errs, np.maximum(mid_idc-1, 0), axis=-1)[..., 0]
+median_abs_errs = np.where((num_data_points % 2 == 1)[:, :, np.newaxis],
+                           upper_mids, 0.5*(lower_mids + upper_mids))
+
 abs_lon_err_dict = {}
 abs_lat_err_dict = {}
 abs_yaw_err_dict = {}
 
-for noise_config_file_name in noise_config_file_names:
-    noise_config = os.path.splitext(noise_config_file_name)[0]
-    noise_config = remove_prefix(noise_config, 'n_')
-
+for i, noise_config in enumerate(noise_config_names):
     print('')
 
-    for sw_config_file_name in sw_config_file_names:
-        sw_config = os.path.splitext(sw_config_file_name)[0]
-        sw_config = remove_prefix(sw_config, 'sw_')
-
+    for j, sw_config in enumerate(sw_config_names):
         results = results_in_all_tests[noise_config][sw_config]
-        lon_errs = results['lon_errs']
-        lat_errs = results['lat_errs']
-        yaw_errs = results['yaw_errs']
 
         if sw_config not in abs_lon_err_dict:
             abs_lon_err_dict[sw_config] = {}
             abs_lat_err_dict[sw_config] = {}
             abs_yaw_err_dict[sw_config] = {}
 
-        lon_abs_errs = np.abs(np.asarray(lon_errs))
-        lat_abs_errs = np.abs(np.asarray(lat_errs))
-        yaw_abs_errs = np.abs(np.asarray(yaw_errs))
-
-        abs_lon_err_dict[sw_config][noise_config] = lon_abs_errs
-        abs_lat_err_dict[sw_config][noise_config] = lat_abs_errs
-        abs_yaw_err_dict[sw_config][noise_config] = yaw_abs_errs
+        # Views of the stacked array without padding
+        abs_lon_err_dict[sw_config][noise_config] = abs_errs[i, j, 0, :num_data_points[i, j]]
+        abs_lat_err_dict[sw_config][noise_config] = abs_errs[i, j, 1, :num_data_points[i, j]]
+        abs_yaw_err_dict[sw_config][noise_config] = abs_errs[i, j, 2, :num_data_points[i, j]]
 
         print('{}, {}:'.format(noise_config, sw_config))
-        print('Number of data points: {}'.format(len(lon_abs_errs)))
+        print('Number of data points: {}'.format(num_data_points[i, j]))
         print(' CPU time mean: {:.6f}'.format(np.mean(results['cpu_times'])))
         print(' CPU time median: {:.6f}'.format(np.median(results['cpu_times'])))
-        print('  Lon mean abs error: {:.2f}'.format(lon_abs_errs.mean()))
-        print('  Lon median abs error: {:.2f}'.format(np.median(lon_abs_errs)))
-        # print('  Lon RMSE: {}'.format(np.sqrt(np.mean(lon_abs_errs**2))))
-        print('  Lat mean abs error: {:.2f}'.format(lat_abs_errs.mean()))
-        print('  Lat median abs error: {:.2f}'.format(np.median(lat_abs_errs)))
-        # print('  Lat RMSE: {}'.format(np.sqrt(np.mean(lat_abs_errs**2))))
-        print('  Yaw mean abs error: {:.3f}'.format(yaw_abs_errs.mean()))
-        print('  Yaw median abs error: {:.3f}'.format(np.median(yaw_abs_errs)))
-        # print('  Yaw RMSE: {}'.format(np.sqrt(np.mean(yaw_abs_errs**2))))
+        print('  Lon mean abs error: {:.2f}'.format(mean_abs_errs[i, j, 0]))
+        print('  Lon median abs error: {:.2f}'.format(median_abs_errs[i, j, 0]))
+        print('  Lat mean abs error: {:.2f}'.format(mean_abs_errs[i, j, 1]))
+        print('  Lat median abs error: {:.2f}'.format(median_abs_errs[i, j, 1]))
+        print('  Yaw mean abs error: {:.3f}'.format(mean_abs_errs[i, j, 2]))
+        print('  Yaw median abs error: {:.3f}'.format(median_abs_errs[i, j, 2]))
 
 # Number of configs
 # Used for boxplot spacing
@@ -150,37 +272,24 @@ if len(NOISE_CONFIG_LABELS) != num_noise_configs:
                        \nNoise config names are: {}'.format(num_noise_configs, noise_config_file_names))
 
 
+# Positions of the boxes of the first sw config
+# Boxes of the same noise config are grouped together with a gap between groups
+base_positions = np.arange(num_noise_configs) * (num_sw_configs+1)
+
 flier = dict(markeredgecolor='gray', marker='+')
 colors = ['tab:blue', 'tab:orange', 'tab:green', 'tab:red']
 fig, axs = plt.subplots(1, 3)
 for idx, (lon_errs, lat_errs, yaw_errs) in enumerate(zip(abs_lon_err_dict.values(),
                                                          abs_lat_err_dict.values(),
                                                          abs_yaw_err_dict.values())):
-    list_of_lon_errs = [err for err in lon_errs.values()]
-    list_of_lat_errs = [err for err in lat_errs.values()]
-    list_of_yaw_errs = [err for err in yaw_errs.values()]
-
-    positions = np.linspace(0, (num_sw_configs+1) *
-                            (num_noise_configs-1), num_noise_configs, dtype=int)
-    positions += idx
-
-    # Box plot of a sw config under different noise configs
-    bp = axs[0].boxplot(
-        list_of_lon_errs, positions=positions, flierprops=flier)
-    set_box_color(bp, colors[idx])
-    axs[0].plot([], c=colors[idx], label=SW_CONFIG_LABELS[idx])
-
-    # Box plot of a sw config under different noise configs
-    bp = axs[1].boxplot(
-        list_of_lat_errs, positions=positions, flierprops=flier)
-    set_box_color(bp, colors[idx])
-    axs[1].plot([], c=colors[idx], label=SW_CONFIG_LABELS[idx])
+    positions = base_positions + idx
 
-    # Box plot of a sw config under different noise configs
-    bp = axs[2].boxplot(
-        list_of_yaw_errs, positions=positions, flierprops=flier)
-    set_box_color(bp, colors[idx])
-    axs[2].plot([], c=colors[idx], label=SW_CONFIG_LABELS[idx])
+    # Box plots of a sw config under different noise configs
+    for ax, errs in zip(axs, (lon_errs, lat_errs, yaw_errs)):
+        bp = ax.boxplot(list(errs.values()),
+                        positions=positions, flierprops=flier)
+        set_box_color(bp, colors[idx])
+        ax.plot([], c=colors[idx], label=SW_CONFIG_LABELS[idx])
 
 
 axs[0].set_ylabel('abs. longitudinal error [m]')
@@ -192,7 +301,7 @@ axs[1].set_ylim((-0.1, 4))
 axs[2].set_ylim((-0.05, 0.5))
 
 first_mid = (num_sw_configs-1)/2
-tick_positions = first_mid + np.arange(num_noise_configs)*(num_sw_configs+1)
+tick_positions = base_positions + first_mid
 for ax in axs:
     ax.set_xticks(tick_positions)
     ax.set_xticklabels(NOISE_CONFIG_LABELS)
@@ -202,10 +311,14 @@ fig.set_size_inches(10, 4)
 axs[0].legend(framealpha=1.0, fontsize=10,
               bbox_to_anchor=(0, 1), loc='lower left')
 fig.tight_layout()
-plt.show()
+if not BATCH_MODE:
+    plt.show()
 
 if FIG_NAME:
     fig.savefig(FIG_NAME+'_box_plot.svg', bbox_inches='tight')
+elif BATCH_MODE:
+    # Nothing is shown in batch mode, so always save the figure
+    fig.savefig(os.path.join(test_dir, 'box_plot.svg'), bbox_inches='tight')
 
 
 # %%
@@ -89,7 +89,7 @@ for noise_config in noise_configs:
         result_dir = os.path.join(noise_level_dir, sw_config)
         path_to_result_file = os.path.join(result_dir,
                                            'results.pkl')
-        with open(path_to_result_file, 'rb') as f:
+        with open(path_to_result_file, 'rb', buffering=1 << 20) as f:
             localization_results = pickle.load(f)
 
         shorten_config_name = remove_prefix(sw_config, 'sw_')
@@ -43,7 +43,7 @@ with open(path_to_config, 'r') as f:
 path_to_result_file = os.path.join(result_dir,
                                    'results.pkl')
 
-with open(path_to_result_file, 'rb') as f:
+with open(path_to_result_file, 'rb', buffering=1 << 20) as f:
     localization_results = pickle.load(f)
 
 loc_gt_seq = localization_results['loc_gt_seq']
@@ -47,7 +47,7 @@ with open(path_to_config, 'r') as f:
 path_to_sem_on = os.path.join(result_sem_on_dir,
                               'results.pkl')
 
-with open(path_to_sem_on, 'rb') as f:
+with open(path_to_sem_on, 'rb', buffering=1 << 20) as f:
     localization_results_sem_on = pickle.load(f)
 
 loc_gt_seq = localization_results_sem_on['loc_gt_seq']
@@ -58,7 +58,7 @@ pose_estimations_sem_on = localization_results_sem_on['pose_estimations']
 path_to_sem_off = os.path.join(result_sem_off_dir,
                                'results.pkl')
 
-with open(path_to_sem_off, 'rb') as f:
+with open(path_to_sem_off, 'rb', buffering=1 << 20) as f:
     localization_results_sem_off = pickle.load(f)
 
 pose_estimations_sem_off = localization_results_sem_off['pose_estimations']
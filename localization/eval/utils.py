@@ -27,45 +27,42 @@ def compute_errors(pose_estis, loc_gt_seq, ori_gt_seq):
     """Compute longitudinal, lateral, and yaw errors.
 
     Args:
-        pose_estis (list): List of pose esitmations in the form of [x, y, theta].
+        pose_estis (array-like): N-by-3 array or list of pose esitmations in the form of [x, y, theta].
         loc_gt_seq (list): List of ground truth locations.
         ori_gt_seq (list): List of ground truth orientations.
     Returns:
-        longitudinal_errors (list): List of longitudinal errors
-        lateral_errors (list): List of lateral errors
-        yaw_errors (list): List of yaw errors
+        longitudinal_errors (np.ndarray): Longitudinal errors
+        lateral_errors (np.ndarray): Lateral errors
+        yaw_errors (np.ndarray): Yaw errors
     """
-    longitudinal_errors = []
-    lateral_errors = []
-    yaw_errors = []
-    for loc_gt, ori_gt, pose_esit in zip(loc_gt_seq, ori_gt_seq, pose_estis):
-        x_gt = loc_gt[0]
-        y_gt = loc_gt[1]
-        yaw_gt = ori_gt[2]
-
-        # Translational error
-        # Matrix that transforms a point in ego frame to world frame
-        tform_e2w = np.array([[math.cos(yaw_gt), -math.sin(yaw_gt), x_gt],
-                              [math.sin(yaw_gt), math.cos(yaw_gt), y_gt],
-                              [0, 0, 1]])
-        tform_w2e = np.linalg.inv(tform_e2w)
-
-        trvec_world = np.array([pose_esit[0], pose_esit[1], 1])
-        trvec_ego = tform_w2e @ trvec_world
-
-        longitudinal_errors.append(trvec_ego[0])
-        lateral_errors.append(trvec_ego[1])
-
-        # Rotational error
-        yaw = pose_esit[2]
-        yaw_error = yaw - yaw_gt
-        # Since yaw angle is in a cyclic space, when the amount of error is larger than 180 degrees,
-        # we need to correct it.
-        if yaw_error > math.pi:
-            yaw_error = 2*math.pi - yaw_error
-        elif yaw_error < -math.pi:
-            yaw_error = 2*math.pi + yaw_error
-        yaw_errors.append(yaw_error)
+    pose_estis = np.asarray(pose_estis, dtype=np.float64)
+    loc_gts = np.asarray(loc_gt_seq, dtype=np.float64)
+    ori_gts = np.asarray(ori_gt_seq, dtype=np.float64)
+    # Only compare the steps that have both estimation and ground truth
+    num_steps = min(pose_estis.shape[0], loc_gts.shape[0], ori_gts.shape[0])
+    pose_estis = pose_estis[:num_steps]
+    x_gts = loc_gts[:num_steps, 0]
+    y_gts = loc_gts[:num_steps, 1]
+    yaw_gts = ori_gts[:num_steps, 2]
+
+    # Translational error
+    # Transform the estimated points from world frame to the ego frame of the ground truth
+    cos_yaw_gts = np.cos(yaw_gts)
+    sin_yaw_gts = np.sin(yaw_gts)
+    x_diffs = pose_estis[:, 0] - x_gts
+    y_diffs = pose_estis[:, 1] - y_gts
+    longitudinal_errors = cos_yaw_gts*x_diffs + sin_yaw_gts*y_diffs
+    lateral_errors = -sin_yaw_gts*x_diffs + cos_yaw_gts*y_diffs
+
+    # Rotational error
+    raw_yaw_errors = pose_estis[:, 2] - yaw_gts
+    # Since yaw angle is in a cyclic space, when the amount of error is larger than 180 degrees,
+    # we need to correct it.
+    yaw_errors = raw_yaw_errors.copy()
+    too_large = raw_yaw_errors > math.pi
+    too_small = raw_yaw_errors < -math.pi
+    yaw_errors[too_large] = 2*math.pi - raw_yaw_errors[too_large]
+    yaw_errors[too_small] = 2*math.pi + raw_yaw_errors[too_small]
 
     return longitudinal_errors, lateral_errors, yaw_errors
 
@@ -89,18 +86,17 @@ def world_to_pixel(location, map_info, offset=(0, 0)):
     return [int(x - offset[0]), int(y - offset[1])]
 
 
-def plot_se2_with_cov(ax, pose, cov, vehicle_size=0.5, ellip_color='k', vehicle_color='r', confidence=0.99):
-    # Plot a triangle representing the ego vehicle
+def _se2_triangle_vertices(pose, vehicle_size):
+    """Compute vertices of the triangle representing the ego vehicle at the given pose."""
     p1 = pose.translation() + pose.so2() * np.array([1, 0]) * vehicle_size
     p2 = pose.translation() + pose.so2() * \
         np.array([-0.5, -0.5]) * vehicle_size
     p3 = pose.translation() + pose.so2() * np.array([-0.5, 0.5]) * vehicle_size
+    return [p1, p2, p3]
 
-    line = plt.Polygon([p1, p2, p3], closed=True, fill=True,
-                       edgecolor='k', facecolor=vehicle_color, zorder=2)
-    triangle = ax.add_line(line)
 
-    # Plot covariance
+def _cov_ellipse_vertices(pose, cov, confidence):
+    """Compute vertices of the confidence ellipse of the given pose and covariance."""
     # Reference: https://gist.github.com/CarstenSchelp/b992645537660bda692f218b562d0712#gistcomment-3465086
     # This approach of ploting covariance has the benefit
     # that it allows to draw ellipse of different confidence
@@ -116,14 +112,52 @@ def plot_se2_with_cov(ax, pose, cov, vehicle_size=0.5, ellip_color='k', vehicle_
     rotm = np.array([[math.cos(yaw), -math.sin(yaw)],
                      [math.sin(yaw), math.cos(yaw)]])
     pts = rotm @ sqrtm(cov_2d) @ circle + pose.translation().reshape(2, 1)
+    return pts.T
+
+
+def plot_se2_with_cov(ax, pose, cov, vehicle_size=0.5, ellip_color='k', vehicle_color='r', confidence=0.99):
+    # Plot a triangle representing the ego vehicle
+    line = plt.Polygon(_se2_triangle_vertices(pose, vehicle_size), closed=True, fill=True,
+                       edgecolor='k', facecolor=vehicle_color, zorder=2)
+    triangle = ax.add_line(line)
 
-    line = plt.Polygon(pts.T, closed=True, fill=False,
-                       edgecolor=ellip_color, zorder=2)
+    # Plot covariance
+    # Covariance is optional. Without it, the ellipse is created but hidden,
+    # so the artists can still be updated later with update_se2_with_cov().
+    if cov is None:
+        line = plt.Polygon(np.zeros((1, 2)), closed=True, fill=False,
+                           edgecolor=ellip_color, zorder=2, visible=False)
+    else:
+        line = plt.Polygon(_cov_ellipse_vertices(pose, cov, confidence), closed=True, fill=False,
+                           edgecolor=ellip_color, zorder=2)
 
     ellipse = ax.add_line(line)
     return triangle, ellipse
 
 
+def update_se2_with_cov(triangle, ellipse, pose, cov, vehicle_size=0.5, confidence=0.99):
+    """Update artists created by plot_se2_with_cov() to show another pose.
+
+    Reusing artists avoids creating and removing patches at every frame of an animation.
+
+    Args:
+        triangle: Polygon representing the ego vehicle.
+        ellipse: Polygon representing the covariance.
+        pose: SE2 pose.
+        cov: Covariance matrix of the pose. The ellipse is hidden if it is None.
+        vehicle_size: Size of the triangle.
+        confidence: Confidence of the region bounded by the ellipse.
+    """
+    triangle.set_xy(_se2_triangle_vertices(pose, vehicle_size))
+    triangle.set_visible(True)
+
+    if cov is None:
+        ellipse.set_visible(False)
+    else:
+        ellipse.set_xy(_cov_ellipse_vertices(pose, cov, confidence))
+        ellipse.set_visible(True)
+
+
 def get_local_map_image(loc_gt_seq, map_image, map_info, margin=25, pose_estimations=None):
     """Get local map image given the trajectory.
 
@@ -146,12 +180,13 @@ def get_local_map_image(loc_gt_seq, map_image, map_info, margin=25, pose_estimat
         y_min = loc_gts[:, 1].min() - margin +10
         y_max = loc_gts[:, 1].max() + margin +10
     else:
-        x_estimations = [pose[0] for pose in pose_estimations]
-        y_estimations = [pose[1] for pose in pose_estimations]
-        x_min = min(loc_gts[:, 0].min(), min(x_estimations)) - margin
-        x_max = max(loc_gts[:, 0].max(), max(x_estimations)) + margin
-        y_min = min(loc_gts[:, 1].min(), min(y_estimations)) - margin
-        y_max = max(loc_gts[:, 1].max(), max(y_estimations)) + margin
+        pose_estimations = np.asarray(pose_estimations)
+        x_estimations = pose_estimations[:, 0]
+        y_estimations = pose_estimations[:, 1]
+        x_min = min(loc_gts[:, 0].min(), x_estimations.min()) - margin
+        x_max = max(loc_gts[:, 0].max(), x_estimations.max()) + margin
+        y_min = min(loc_gts[:, 1].min(), y_estimations.min()) - margin
+        y_max = max(loc_gts[:, 1].max(), y_estimations.max()) + margin
 
     extent = [x_min, x_max, y_min, y_max]
     x_center = (x_max + x_min)/2
@@ -350,10 +385,22 @@ def gen_gt_path_plot(loc_gt_seq, sign_pole_coords, general_pole_coords,
     return fig, ax
 
 
+def gen_path_segments(pose_estimations):
+    """Generate line segments of the estimated path for LineCollection.
+
+    Args:
+        pose_estimations (array-like): N-by-3 array or list of pose esitmations in the form of [x, y, theta].
+    Returns:
+        segments: (N-1)-by-2-by-2 array. Each segment consists of two consecutive points.
+    """
+    points = np.asarray(pose_estimations)[:, np.newaxis, 0:2]
+    return np.concatenate((points[:-1], points[1:]), axis=1)
+
+
 def gen_colored_error_plot(title, abs_errors, upper_bound,
                            loc_gt_seq, pose_estimations,
                            sign_pole_coords, general_pole_coords,
-                           local_map_img, extent, size=7, zoom_in=False):
+                           local_map_img, extent, size=7, zoom_in=False, segments=None):
     """Generate colored error plot.
 
     Args:
@@ -369,6 +416,9 @@ def gen_colored_error_plot(title, abs_errors, upper_bound,
         size (float): Maximum size (inch).
         zoom_in (bool): Add zoom-in elements for the highway scenario.
                         This is a dedicated feature for the particular scenarios.
+        segments (np.ndarray): Path segments generated by gen_path_segments().
+                               Given when several plots share the same path; otherwise
+                               they are generated from pose_estimations.
     Returns:
         Result figure and axes object.
     """
@@ -380,10 +430,8 @@ def gen_colored_error_plot(title, abs_errors, upper_bound,
                                local_map_img, extent, size)
 
     # Prepare path segments
-    x_estimations = [pose[0] for pose in pose_estimations]
-    y_estimations = [pose[1] for pose in pose_estimations]
-    points = np.array([x_estimations, y_estimations]).T.reshape(-1, 1, 2)
-    segments = np.concatenate((points[:-1], points[1:]), axis=1)
+    if segments is None:
+        segments = gen_path_segments(pose_estimations)
 
     # Resultant path with color
     norm = plt.Normalize(0, upper_bound)
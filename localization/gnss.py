@@ -24,20 +24,22 @@ class GNSSFactor(Factor):
         loss = DiagonalLoss.Sigmas(
             np.array([self.config['stddev_x'], self.config['stddev_y']]))
         Factor.__init__(self, 1, [key], loss)
+        # Key of the pose, cached since keys() is a call into minisam
+        self._key0 = self.keys()[0]
 
     def copy(self):
         """Deep copy."""
-        return GNSSFactor(self.keys()[0], self.p_, self.config)
+        return GNSSFactor(self._key0, self.p_, self.config)
 
     def error(self, variables):
         """Compute error."""
-        pose = variables.at(self.keys()[0])
+        pose = variables.at(self._key0)
         return pose.translation() - self.p_
 
     def jacobians(self, variables):
         """Compute the jacobian at the current linearization point."""
         # GTSAM and thus minisam requires Jacobian to be defined wrt the body frame
-        pose = variables.at(self.keys()[0])
+        pose = variables.at(self._key0)
         theta = pose.so2().theta()
         return [np.array([[cos(theta), -sin(theta), 0], [sin(theta), cos(theta), 0]])]
 
@@ -416,16 +416,14 @@ class SlidingWindowGraphManager(object):
         """Move sliding window forward if necessary."""
         # Perform truncation if number of nodes exceeds the specified sliding window size
         if self.get_graph_size() > self.win_size:
-            # Remove all factor related to the first node
-            self._truncate_first_node()
-
             # The following are for the case where previous a posteriori is to be used as a priori
             if self.use_prev_posteriori:
                 # Now the original second node becomes the first node.
                 # Remove all unary factors related to it as they are already taken into account
                 # in previous steps and are absorbed into the prior. That is, the prior already
                 # involves the information of these unary factors.
-                self._remove_unary_factors_from_first_node()
+                # This is done in the same pass as the truncation so the graph is rebuilt only once.
+                self._truncate_first_node(remove_next_unary=True)
 
                 # Add prior factor back to the graph
                 prior_idx, prior_pose, prior_cov = self._history_a_posteriori.popleft()
@@ -438,6 +436,9 @@ class SlidingWindowGraphManager(object):
                         'First node index does not match the one of stored prior!')
                 self.add_prior_factor(
                     prior_x, prior_y, prior_theta, prior_cov)
+            else:
+                # Remove all factor related to the first node
+                self._truncate_first_node()
 
     def _optimize_graph(self):
         """Optimize the factor graph."""
@@ -475,30 +476,48 @@ class SlidingWindowGraphManager(object):
             print("maginal covariance error")
             print(status)
 
-    def _truncate_first_node(self):
+    def _truncate_first_node(self, remove_next_unary=False):
         """Truncate the first node in the current graph.
 
         Used when the graph size exceeds the specified window size. All factors
         related to the first node are simply deleted. It is done by creating a new
         FactorGraph without factors connected to the first pose node.
+
+        If the a posteriori of the second node, which becomes the first node afterwards, was
+        recorded in a previous step and is used as a priori in this step, all unary factors
+        already taken into account to obtain the a posteriori must be removed as well. Otherwise,
+        the same information contributes twice and leads to over-confident estimation. Since only
+        in order factor adding is supported, these factors are supposed to be unary.
+
+        Args:
+            remove_next_unary (bool): True to also remove unary factors related to the
+                second node and its initial guess in the same pass.
         """
         # Remove initial for the prior node
         first_node_key = ms.key('x', self._idc_in_graph[0])
         self.initials.erase(first_node_key)
 
+        if remove_next_unary:
+            # Remove initial for the node that will become the prior node
+            next_node_key = ms.key('x', self._idc_in_graph[1])
+            self.initials.erase(next_node_key)
+        else:
+            next_node_key = None
+
         # Create a new graph without factors connected to the first node
         new_graph = ms.FactorGraph()
         for factor in self.graph:
-            keep = True
+            keys = factor.keys()
 
             # Check if this factor connects to the first node
-            for k in factor.keys():
-                if k == first_node_key:
-                    keep = False
-                    break
+            if first_node_key in keys:
+                continue
+
+            # Check if it's a unary factor and connects to the next node
+            if len(keys) == 1 and keys[0] == next_node_key:
+                continue
 
-            if keep:
-                new_graph.add(factor)
+            new_graph.add(factor)
 
         # Replace the new graph
         self.graph = new_graph
@@ -506,41 +525,6 @@ class SlidingWindowGraphManager(object):
         # Remove the left most node index from queue
         self._idc_in_graph.popleft()
 
-    def _remove_unary_factors_from_first_node(self):
-        """Remove unary factors related to the first node.
-
-        If the a posteriori of the current first node is recorded in a previous step, where it
-        was the last node, and used as a priori in this step, all factors already taken into
-        account to obtain the a posteriori must be removed. Otherwise, the same information will
-        contirbutes twice and leads to over-confident estimation.
-
-        Since the current implementation supports only in order factor adding, factors to be removed
-        are supposed to be unary in this localization case.
-
-        It is done by creating a new FactorGraph without factors that have to be removed.
-        """
-        # Remove initial for the prior node
-        first_node_key = ms.key('x', self._idc_in_graph[0])
-        self.initials.erase(first_node_key)
-
-        # Create a new graph without factors connected to the first node
-        new_graph = ms.FactorGraph()
-        for factor in self.graph:
-            keep = True
-
-            # Check if it's a unary factor and connects to the first node
-            if len(factor.keys()) == 1 and first_node_key == factor.keys()[0]:
-                keep = False
-
-            if keep:
-                new_graph.add(factor)
-
-        # Replace the new graph
-        self.graph = new_graph
-
-        # No need to remove the left most node index from queue since the node
-        # still exists and is connected with at least to a between factor
-
     def _clear_history(self):
         """Clear the history in the graph."""
         while self.get_graph_size() > 0:
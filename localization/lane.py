@@ -1,12 +1,15 @@
 """ Implementation of lane-related factors """
 
+import functools
+import math
+
 import numpy as np
-from scipy.stats import chi2, multivariate_normal
 from scipy.optimize import linear_sum_assignment as lsa
 from minisam import Factor, DiagonalLoss
 
 from carlasim.carla_tform import Transform
 from carlasim.utils import get_fbumper_location
+from .utils import bivariate_normal_pdf
 
 
 def compute_normal_form_line_coeffs(px, expected_c0, expected_c1):
@@ -25,9 +28,11 @@ def compute_normal_form_line_coeffs(px, expected_c0, expected_c1):
     Returns:
         Normal form parameters a, b, c, and alpha.
     """
-    alpha = np.arctan(expected_c1)
-    a_l = -np.sin(alpha)
-    b_l = np.cos(alpha)
+    # Scalar math functions are used since numpy's ufuncs have a large overhead on scalars
+    alpha = math.atan(expected_c1)
+    # Since tan(alpha) = c1, sin(alpha) and cos(alpha) can be computed without trig functions
+    b_l = 1. / math.sqrt(1. + expected_c1*expected_c1)
+    a_l = -expected_c1*b_l
     c_l = a_l*px + b_l*expected_c0
 
     return a_l, b_l, c_l, alpha
@@ -46,22 +51,97 @@ def compute_H(px, expected_c0, expected_c1):
     Returns:
         H matrix as np.ndarray.
     """
-    a, b, c, alpha = compute_normal_form_line_coeffs(px,
-                                                     expected_c0,
-                                                     expected_c1)
-
-    h13 = -px + (-a*c + a*a*px)/b**2
+    # With the normal form a = -sin(alpha), b = cos(alpha), c = a*px + b*c0, and tan(alpha) = c1,
+    # h13 = -px + (-a*c + a*a*px)/b**2 reduces to c0*c1 - px,
+    # and h23 = -1/cos(alpha)**2 reduces to -(1 + c1**2).
+    h13 = expected_c0*expected_c1 - px
+    h23 = -(1. + expected_c1*expected_c1)
 
     H = np.array([[expected_c1, -1, h13],
-                  [0, 0, -1/np.cos(alpha)**2]])
+                  [0, 0, h23]])
 
     return H
 
 
+def compute_H_batched(px, expected_c0s, expected_c1s):
+    """Compute H matrices of multiple expected lane boundaries at once.
+
+    This is the vectorized version of compute_H().
+
+    Args:
+        px: Logitudinal distance from the local frame to the front bumper.
+        expected_c0s: 1D np.ndarray of expected c0 coefficients.
+        expected_c1s: 1D np.ndarray of expected c1 coefficients.
+
+    Returns:
+        H matrices as np.ndarray of shape (N, 2, 3).
+    """
+    # See compute_H() for the derivation of the trig-free entries
+    H = np.zeros((expected_c0s.shape[0], 2, 3))
+    H[:, 0, 0] = expected_c1s
+    H[:, 0, 1] = -1
+    H[:, 0, 2] = expected_c0s*expected_c1s - px
+    H[:, 1, 2] = -(1. + expected_c1s*expected_c1s)
+
+    return H
+
+
+def compute_innovs_batched(H, pose_uncert, noise_cov):
+    """Compute innovation matrices of multiple expected lane boundaries at once.
+
+    The second row of H is always [0, 0, h23], so H*P*H^T is expanded in closed form
+    instead of doing dense matrix products.
+
+    Args:
+        H: H matrices as np.ndarray of shape (N, 2, 3).
+        pose_uncert: 3-by-3 pose uncertainty matrix.
+        noise_cov: 2-by-2 measurement noise covariance matrix.
+
+    Returns:
+        Innovation matrices as np.ndarray of shape (N, 2, 2).
+    """
+    h1 = H[:, 0, :]
+    h23 = H[:, 1, 2]
+    h1_p = h1 @ pose_uncert
+
+    innovs = np.empty((H.shape[0], 2, 2))
+    innovs[:, 0, 0] = np.einsum('ni,ni->n', h1_p, h1) + noise_cov[0, 0]
+    innovs[:, 0, 1] = h23 * h1_p[:, 2] + noise_cov[0, 1]
+    innovs[:, 1, 0] = h23 * (h1 @ pose_uncert[2, :]) + noise_cov[1, 0]
+    innovs[:, 1, 1] = h23 * h23 * pose_uncert[2, 2] + noise_cov[1, 1]
+
+    return innovs
+
+
+
+@functools.lru_cache(maxsize=8)
+def _lane_factor_noise_model(stddev_c0, stddev_c1, prob_null, null_std_scale):
+    """Build the quantities of a lane boundary factor that only depend on its config.
+
+    Args:
+        stddev_c0: Standard deviation of c0 measurement.
+        stddev_c1: Standard deviation of c1 measurement.
+        prob_null: Null hypothesis probability.
+        null_std_scale: Scale for noise cov for null hypothesis.
+
+    Returns:
+        noise_cov: Noise covariance matrix of c0 and c1.
+        loss: Diagonal loss built from the standard deviations.
+        null_weighted_meas_likelihood: Measurement likelihood of null hypo weighted by null probability.
+    """
+    noise_cov = np.diag([stddev_c0**2, stddev_c1**2])
+    loss = DiagonalLoss.Sigmas(np.array([stddev_c0, stddev_c1]))
+    # Since the error of null hypo is always zero and the noise cov is diagonal,
+    # the Gaussian density reduces to its normalization constant.
+    null_weighted_meas_likelihood = prob_null \
+        / (2*math.pi * stddev_c0*stddev_c1 * null_std_scale**2)
+    return noise_cov, loss, null_weighted_meas_likelihood
+
 class LaneBoundaryFactor(Factor):
     """ Max-mixture PDA Lane boundary factor. """
     # float: Geometric gate
-    geo_gate = chi2.ppf(0.99999999, df=2)
+    # Chi-squared quantile with 2 DOF has the closed form -2*ln(1-p)
+    geo_gate = -2*math.log(1-0.99999999)
     # float: Semantic gate
     sem_gate = 0.9
 
@@ -89,8 +169,15 @@ class LaneBoundaryFactor(Factor):
         self.z = z
         self.pose_uncert = pose_uncert
         self.config = lane_factor_config
-        self.noise_cov = np.diag([lane_factor_config['stddev_c0']**2,
-                                  lane_factor_config['stddev_c1']**2])
+
+        # ndarray: Measured c0 and c1. The measurement never changes, so it is only parsed once.
+        self._measured_coeffs = np.asarray(
+            detected_marking.get_c0c1_list(), dtype=np.float64)
+        # list: Expected c0 and c1 of null hypothesis.
+        # Use the measurement itself at every optimization iteration as the null hypothesis.
+        # This is, of course, just a trick.
+        # This means the error for null hypothesis is always zeros.
+        self._null_expected_c0c1 = self._measured_coeffs.tolist()
 
         # bool: True to turn on semantic association
         self.semantic = self.config['semantic']
@@ -122,25 +209,32 @@ class LaneBoundaryFactor(Factor):
         # Attributes for static expected lane boundary extraction
         # bool: True if error is computed the first time
         self._first_time = True
-        # tuple: a, b, c, and alpha describing the lines extracted using initially guessed pose
+        # ndarray: Each row is a, b, c, and tan(alpha) describing a line extracted using initially guessed pose
         self._init_normal_forms = None
         self._init_types = None
 
         # list: Stores chosen c0 and c1 of chosen expected lane boundary
         self.chosen_expected_coeffs = None
+        # ndarray: H matrix of chosen expected lane boundary
+        self._chosen_H = None
         # float: Scale for the chosen Gaussian mode based on its association weight
         self._scale = 1.0
         # bool: True if null hypothesis is chosen
         self._null_hypo = False
 
-        loss = DiagonalLoss.Sigmas(np.array(
-            [self.config['stddev_c0'],
-             self.config['stddev_c1']]))
+        # Thousands of lane factors share the same config, so the noise cov, the loss,
+        # and the null hypo likelihood are built once per set of config values and reused.
+        # The loss is never modified after construction, so sharing it is safe.
+        self.noise_cov, loss, self._null_weighted_meas_likelihood = _lane_factor_noise_model(
+            lane_factor_config['stddev_c0'], lane_factor_config['stddev_c1'],
+            self.prob_null, self.null_std_scale)
 
         Factor.__init__(self, 1, [key], loss)
+        # Key of the pose, cached since keys() is a call into minisam
+        self._key0 = self.keys()[0]
 
     def copy(self):
-        return LaneBoundaryFactor(self.keys()[0],
+        return LaneBoundaryFactor(self._key0,
                                   self.detected_marking,
                                   self.z,
                                   self.pose_uncert,
@@ -148,7 +242,7 @@ class LaneBoundaryFactor(Factor):
 
     def error(self, variables):
         ########## Expectation ##########
-        pose = variables.at(self.keys()[0])
+        pose = variables.at(self._key0)
         location = np.append(pose.translation(), self.z)  # append z
         orientation = np.array([0, 0, pose.so2().theta()])
 
@@ -172,23 +266,28 @@ class LaneBoundaryFactor(Factor):
                 expected_type_list = [expected.type
                                       for expected in self.me_format_expected_markings]
 
-                # The snapshot is stored in their normal forms; i.e. a, b, c, and alpha describing the lines
-                self._init_normal_forms = [compute_normal_form_line_coeffs(self.px, c[0], c[1])
-                                           for c in expected_coeffs_list]
+                # The snapshot is stored in their normal forms; i.e. a, b, c, and tan(alpha) describing the lines
+                # tan(alpha) is simply the c1 coefficient since alpha = atan(c1)
+                # Each row of the array is the normal form of a line
+                self._init_normal_forms = np.empty((len(expected_coeffs_list), 4))
+                for idx, (c0, c1) in enumerate(expected_coeffs_list):
+                    a, b, c, _ = compute_normal_form_line_coeffs(self.px, c0, c1)
+                    self._init_normal_forms[idx] = (a, b, c, c1)
                 # Snapshot of lane boundary types
                 self._init_types = expected_type_list
 
                 self._first_time = False
+            elif self.ignore_junction and (self.in_junction or self.into_junction):
+                # The snapshot was taken in junction, so the null hypothesis is always chosen
+                return self._null_hypo_error()
             else:
                 # Not first time, use snapshot of lane boundaries extracted the first time to compute error
                 # Pose difference is wrt local frame
                 pose_diff = self._get_pose_diff(location, orientation)
 
                 # Compute expected lane boundary coefficients using the snapshot
-                expected_coeffs_list = []
-                for normal_form in self._init_normal_forms:
-                    c0c1 = self._compute_expected_c0c1(normal_form, pose_diff)
-                    expected_coeffs_list.append(c0c1)
+                expected_coeffs_list = self._compute_expected_c0c1_batched(
+                    self._init_normal_forms, pose_diff)
                 # Retrieve lane boundary types from snapshot
                 expected_type_list = self._init_types
         else:
@@ -199,6 +298,9 @@ class LaneBoundaryFactor(Factor):
             self.in_junction, self.into_junction, self.me_format_expected_markings = self.expected_lane_extractor.extract(
                 fbumper_location, orientation)
 
+            if self.ignore_junction and (self.in_junction or self.into_junction):
+                return self._null_hypo_error()
+
             # List of expected markings' coefficients
             expected_coeffs_list = [expected.get_c0c1_list()
                                     for expected in self.me_format_expected_markings]
@@ -208,23 +310,11 @@ class LaneBoundaryFactor(Factor):
                                   for expected in self.me_format_expected_markings]
 
         ########## Measurement ##########
-        measured_coeffs = np.asarray(
-            self.detected_marking.get_c0c1_list()).reshape(2, -1)
+        measured_coeffs = self._measured_coeffs
         measured_type = self.detected_marking.type
 
-        # Null hypothesis
-        # Use the measurement itself at every optimization iteration as the null hypothesis.
-        # This is, of course, just a trick.
-        # This means the error for null hypothesis is always zeros.
-        null_expected_c0c1 = measured_coeffs.squeeze().tolist()
-        null_error = np.zeros((2, 1))
-
-        # Compute innovation matrix for the null hypo
-        null_noise_cov = self.noise_cov * self.null_std_scale**2
-
-        # Compute measurement likelihood weighted by null probability
-        null_weighted_meas_likelihood = self.prob_null * \
-            multivariate_normal.pdf(null_error.squeeze(), cov=null_noise_cov)
+        # Measurement likelihood weighted by null probability
+        null_weighted_meas_likelihood = self._null_weighted_meas_likelihood
 
         # In this implementation, scaling down error and jacobian is done to achieve
         # the same effect of tuning the information matrix online.
@@ -235,106 +325,93 @@ class LaneBoundaryFactor(Factor):
 
         if self.ignore_junction and (self.in_junction or self.into_junction):
             self._null_hypo = True
-        elif not expected_coeffs_list:
+        elif len(expected_coeffs_list) == 0:
             self._null_hypo = True
         else:
             # Data association
-            errors = [null_error]
-            gated_coeffs_list = [null_expected_c0c1]
-            asso_probs = []
-            meas_likelihoods = []
-            sem_likelihoods = []
-            for exp_coeffs, exp_type in zip(expected_coeffs_list, expected_type_list):
-                # Compute innovation matrix
-                expected_c0, expected_c1 = exp_coeffs
-                H = compute_H(self.px, expected_c0, expected_c1)
-                innov = H @ self.pose_uncert @ H.T + self.noise_cov
-
-                # Compute squared mahalanobis distance
-                error = np.asarray(exp_coeffs).reshape(
-                    2, -1) - measured_coeffs
-                # Mahalanobis distance is only needed for geometric gating
-                # squared_mahala_dist = error.T @ np.linalg.inv(innov) @ error
-
-                # Semantic likelihood
-                if self.semantic:
-                    # Conditional probability on type
-                    sem_likelihood = self._conditional_prob_type(
-                        exp_type, measured_type)
-                else:
-                    # Truning off semantic association is equivalent to always
-                    # set semantic likelihood to 1.0
-                    sem_likelihood = 1.0
-
-                # Gating (geometric and semantic)
-                # Reject both geometrically and semantically unlikely associations
-                # Note:
-                # Since location distribution across lanes is essentially multimodal,
-                # geometric gating often used when assuming location is unimodal is not
-                # very reasonable and will inevitablly reject possible associations.
-                # Here the geometric gate is set very large so we can preserve associations that
-                # are a bit far from the current mode (the only mode that exists in the optimization)
-                # but still possible when the multimodal nature is concerned.
-                # Or, we can simply give up geometric gating and use semantic gating only.
-                # The large geometric gate is an inelegant remedy after all.
-                # if squared_mahala_dist <= self.geo_gate and sem_likelihood > self.sem_gate:
-                if sem_likelihood > self.sem_gate:
-                    gated_coeffs_list.append(exp_coeffs)
-                    errors.append(error)
-
-                    # Measurement likelihood (based on noise cov)
-                    meas_likelihood = multivariate_normal.pdf(
-                        error.reshape(-1), cov=self.noise_cov)
-
-                    # Geometric likelihood (based on innov)
-                    geo_likelihood = multivariate_normal.pdf(
-                        error.reshape(-1), cov=innov)
-
-                    # Due to numerical errors, likelihood can become exactly 0.0
-                    # in some very rare cases.
-                    # When it happens, simply ignore it.
-                    if meas_likelihood > 0.0 and geo_likelihood > 0.0:
-                        meas_likelihoods.append(sem_likelihood*meas_likelihood)
-                        sem_likelihoods.append(sem_likelihood)
-                        asso_prob = geo_likelihood * sem_likelihood
-                        asso_probs.append(asso_prob)
+            # All expected lane boundaries are processed at once as rows of (N, 2) arrays.
+            expected_coeffs = np.asarray(
+                expected_coeffs_list, dtype=np.float64).reshape(-1, 2)
+
+            # Semantic likelihood
+            if self.semantic:
+                # Conditional probability on type
+                sem_likelihoods = np.array([self._conditional_prob_type(exp_type, measured_type)
+                                            for exp_type in expected_type_list])
+            else:
+                # Truning off semantic association is equivalent to always
+                # set semantic likelihood to 1.0
+                sem_likelihoods = np.ones(expected_coeffs.shape[0])
+
+            # Gating (geometric and semantic)
+            # Reject both geometrically and semantically unlikely associations
+            # Note:
+            # Since location distribution across lanes is essentially multimodal,
+            # geometric gating often used when assuming location is unimodal is not
+            # very reasonable and will inevitablly reject possible associations.
+            # Here the geometric gate is set very large so we can preserve associations that
+            # are a bit far from the current mode (the only mode that exists in the optimization)
+            # but still possible when the multimodal nature is concerned.
+            # Or, we can simply give up geometric gating and use semantic gating only.
+            # The large geometric gate is an inelegant remedy after all.
+            # gated = (squared_mahala_dists <= self.geo_gate) & (sem_likelihoods > self.sem_gate)
+            gated = sem_likelihoods > self.sem_gate
+            gated_coeffs = expected_coeffs[gated]
+            sem_likelihoods = sem_likelihoods[gated]
+
+            # Errors wrt all gated expected lane boundaries
+            errors = gated_coeffs - measured_coeffs
+
+            # Compute innovation matrices
+            H = compute_H_batched(self.px, gated_coeffs[:, 0], gated_coeffs[:, 1])
+            innovs = compute_innovs_batched(H, self.pose_uncert, self.noise_cov)
+
+            # Measurement likelihood (based on noise cov)
+            meas_likelihoods = bivariate_normal_pdf(errors, cov=self.noise_cov)
+            # Geometric likelihood (based on innov)
+            geo_likelihoods = bivariate_normal_pdf(errors, cov=innovs)
+
+            # Due to numerical errors, likelihood can become exactly 0.0
+            # in some very rare cases.
+            # When it happens, simply ignore it.
+            valid = (meas_likelihoods > 0.0) & (geo_likelihoods > 0.0)
+            gated_coeffs = gated_coeffs[valid]
+            errors = errors[valid]
+            H = H[valid]
+            sem_likelihoods = sem_likelihoods[valid]
+            meas_likelihoods = sem_likelihoods * meas_likelihoods[valid]
+            asso_probs = geo_likelihoods[valid] * sem_likelihoods
 
             # Check if any possible association exists after gating
-            if asso_probs:
-                asso_probs = np.asarray(asso_probs)
-                meas_likelihoods = np.asarray(meas_likelihoods)
-
-                # Compute weights based on total probability theorem
-                weights = (1-self.prob_null) * \
-                    (asso_probs/np.sum(asso_probs))
-                # Weight measurement likelihoods
-                weighted_meas_likelihood = weights*meas_likelihoods
-
-                # Add weight and weighted likelihood of null hypothesis
-                weights = np.insert(weights, 0, self.prob_null)
-                weighted_meas_likelihood = np.insert(
-                    weighted_meas_likelihood, 0, null_weighted_meas_likelihood)
-
-                asso_idx = np.argmax(weighted_meas_likelihood)
-
-                if asso_idx == 0:
+            if asso_probs.size:
+                # Weights based on total probability theorem are (1-prob_null)*asso_probs/sum(asso_probs).
+                # The normalization is the same for all expected lane boundaries, so the best
+                # one can be found before computing its weight.
+                best_idx = np.argmax(asso_probs*meas_likelihoods)
+                weight = (1-self.prob_null) * \
+                    (asso_probs[best_idx]/np.sum(asso_probs))
+                # Weighted measurement likelihood of the best expected lane boundary
+                weighted_meas_likelihood = weight*meas_likelihoods[best_idx]
+
+                # Null hypothesis wins ties, as it comes first in the mixture
+                if weighted_meas_likelihood <= null_weighted_meas_likelihood:
                     self._null_hypo = True
                 else:
                     self._null_hypo = False
-                    self.chosen_expected_coeffs = gated_coeffs_list[asso_idx]
+                    self.chosen_expected_coeffs = gated_coeffs[best_idx].tolist()
+                    # H of the chosen hypothesis is reused by jacobians()
+                    self._chosen_H = H[best_idx]
                     # Scale down the hypothesis to account for target uncertainty
                     # This form is empirically chosen
-                    self._scale = weights[asso_idx] * sem_likelihoods[asso_idx-1]
+                    self._scale = weight * sem_likelihoods[best_idx]
                     # Scale down the error based on weight
                     # This is to achieve the same effect of scaling infomation matrix during optimzation
-                    chosen_error = errors[asso_idx] * self._scale
+                    chosen_error = errors[best_idx].reshape(2, 1) * self._scale
             else:
                 self._null_hypo = True
 
         if self._null_hypo:
-            # Null hypothesis
-            self.chosen_expected_coeffs = null_expected_c0c1
-            chosen_error = null_error
+            return self._null_hypo_error()
 
         return chosen_error
 
@@ -346,14 +423,18 @@ class LaneBoundaryFactor(Factor):
             # Zero error and jacobian together effectively result in zero information matrix as well.
             jacob = np.zeros((2, 3))
         else:
-            expected_c0, expected_c1 = self.chosen_expected_coeffs
-            jacob = compute_H(self.px, expected_c0, expected_c1)
             # Scale down jacobian matrix based on weight
             # This is to achieve the same effect of scaling infomation matrix during optimzation
-            jacob *= self._scale
+            jacob = self._chosen_H * self._scale
 
         return [jacob]
 
+    def _null_hypo_error(self):
+        """Choose null hypothesis and return its error."""
+        self._null_hypo = True
+        self.chosen_expected_coeffs = self._null_expected_c0c1
+        return np.zeros((2, 1))
+
     def _get_pose_diff(self, location, orientation):
         """Get pose difference from the initial guess."""
         if self._init_tform is None or self._init_orientation is None:
@@ -365,14 +446,29 @@ class LaneBoundaryFactor(Factor):
         dtheta = orientation[2] - self._init_orientation[2]
         return dx, dy, dtheta
 
-    def _compute_expected_c0c1(self, normal_form, pose_diff):
-        """Compute exptected c0 and c1 using normal form and pose difference."""
-        a, b, c, alpha = normal_form
+    def _compute_expected_c0c1_batched(self, normal_forms, pose_diff):
+        """Compute exptected c0 and c1 of all lines using normal forms and pose difference.
+
+        Args:
+            normal_forms: np.ndarray of shape (N, 4). Each row is a, b, c, and tan(alpha) of a line.
+            pose_diff: Pose difference dx, dy, and dtheta.
+
+        Returns:
+            Expected c0 and c1 as np.ndarray of shape (N, 2).
+        """
+        a, b, c, tan_alpha = normal_forms.T
         dx, dy, dtheta = pose_diff
-        c0 = (c - a*dx - a*self.px*np.cos(dtheta) - b*dy - b*self.px*np.sin(dtheta)) \
-            / (-a*np.sin(dtheta) + b*np.cos(dtheta))
-        c1 = np.tan(alpha - dtheta)
-        return (c0, c1)
+        # Trigonometric terms only depend on the pose difference
+        cos_d = math.cos(dtheta)
+        sin_d = math.sin(dtheta)
+        tan_d = math.tan(dtheta)
+
+        expected_coeffs = np.empty((normal_forms.shape[0], 2))
+        expected_coeffs[:, 0] = (c - a*dx - a*self.px*cos_d - b*dy - b*self.px*sin_d) \
+            / (-a*sin_d + b*cos_d)
+        # tan(alpha - dtheta)
+        expected_coeffs[:, 1] = (tan_alpha - tan_d) / (1 + tan_alpha*tan_d)
+        return expected_coeffs
 
     @staticmethod
     def _conditional_prob_type(expected_type, measured_type):
@@ -407,7 +503,8 @@ class GNNLaneBoundaryFactor(Factor):
     operation for multiple distributions.
     """
     # float: Geometric gate
-    geo_gate = chi2.ppf(0.99999999, df=2)
+    # Chi-squared quantile with 2 DOF has the closed form -2*ln(1-p)
+    geo_gate = -2*math.log(1-0.99999999)
     # float: Semantic gate
     sem_gate = 0.9
 
@@ -491,9 +588,11 @@ class GNNLaneBoundaryFactor(Factor):
                 self.config['stddev_c1']]))
 
         Factor.__init__(self, 1, [key], loss)
+        # Key of the pose, cached since keys() is a call into minisam
+        self._key0 = self.keys()[0]
 
     def copy(self):
-        return GNNLaneBoundaryFactor(self.keys()[0],
+        return GNNLaneBoundaryFactor(self._key0,
                                      self.lane_marking_detection,
                                      self.z,
                                      self.pose_uncert,
@@ -501,7 +600,7 @@ class GNNLaneBoundaryFactor(Factor):
 
     def error(self, variables):
         ########## Expectation ##########
-        pose = variables.at(self.keys()[0])
+        pose = variables.at(self._key0)
         location = np.append(pose.translation(), self.z)  # append z
         orientation = np.array([0, 0, pose.so2().theta()])
 
@@ -579,12 +678,11 @@ class GNNLaneBoundaryFactor(Factor):
         null_expected_c0c1_right = self.right_marking.get_c0c1_list()
         null_error = np.zeros((2, 1))   # same for both left and right
 
-        # Compute innovation matrix for the null hypo
-        null_noise_cov = self.noise_cov * self.null_std_scale**2
-
         # Compute measurement likelihood weighted by null probability
-        null_weighted_meas_likelihood = self.prob_null * \
-            multivariate_normal.pdf(null_error.squeeze(), cov=null_noise_cov)
+        # Since the error of null hypo is always zero and the noise cov is diagonal,
+        # the Gaussian density reduces to its normalization constant.
+        null_weighted_meas_likelihood = self.prob_null \
+            / (2*math.pi * self.config['stddev_c0']*self.config['stddev_c1'] * self.null_std_scale**2)
 
         # In this implementation, scaling down error and jacobian is done to achieve
         # the same effect of tuning the information matrix online.
@@ -646,11 +744,11 @@ class GNNLaneBoundaryFactor(Factor):
                     errors_left.append(error)
 
                     # Measurement likelihood (based on noise cov)
-                    meas_likelihood = multivariate_normal.pdf(
+                    meas_likelihood = bivariate_normal_pdf(
                         error.reshape(-1), cov=self.noise_cov)
 
                     # Geometric likelihood (based on innov)
-                    geo_likelihood = multivariate_normal.pdf(
+                    geo_likelihood = bivariate_normal_pdf(
                         error.reshape(-1), cov=innov)
 
                     meas_likelihoods.append(meas_likelihood)
@@ -723,11 +821,11 @@ class GNNLaneBoundaryFactor(Factor):
                     errors_right.append(error)
 
                     # Measurement likelihood (based on noise cov)
-                    meas_likelihood = multivariate_normal.pdf(
+                    meas_likelihood = bivariate_normal_pdf(
                         error.reshape(-1), cov=self.noise_cov)
 
                     # Geometric likelihood (based on innov)
-                    geo_likelihood = multivariate_normal.pdf(
+                    geo_likelihood = bivariate_normal_pdf(
                         error.reshape(-1), cov=innov)
 
                     meas_likelihoods.append(meas_likelihood)
@@ -3,7 +3,6 @@
 import math
 
 import numpy as np
-from scipy.stats import chi2
 from minisam import Factor, DiagonalLoss
 
 from .utils import multivariate_normal_pdf
@@ -39,7 +38,8 @@ def compute_H(prc, exp_x, exp_y):
 
 class PoleFactor(Factor):
     """Pole factor."""
-    geo_gate = chi2.ppf(0.9, df=2)
+    # Chi-squared quantile with 2 DOF has the closed form -2*ln(1-p)
+    geo_gate = -2*math.log(1-0.9)
     sem_gate = 0.9
 
     # Attributes that needs to be initialized.
@@ -90,9 +90,11 @@ class PoleFactor(Factor):
              self.config['stddev_phi']]))
 
         Factor.__init__(self, 1, [key], loss)
+        # Key of the pose, cached since keys() is a call into minisam
+        self._key0 = self.keys()[0]
 
     def copy(self):
-        return PoleFactor(self.keys()[0],
+        return PoleFactor(self._key0,
                           self.detected_pole,
                           self.neighbor_poles,
                           self.pose_uncert,
@@ -100,7 +102,7 @@ class PoleFactor(Factor):
 
     def error(self, variables):
         ########## Expectation ##########
-        pose = variables.at(self.keys()[0])
+        pose = variables.at(self._key0)
         yaw = pose.so2().theta()
 
         # Need to transform map poles in the neighborhood into ego (rear axle) frame
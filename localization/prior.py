@@ -61,9 +61,11 @@ class MMPriorFactor(Factor):
             self.prior_noise_model = GaussianLoss.Covariance(self.prior_cov)
 
         Factor.__init__(self, 1, [key], self.prior_noise_model)
+        # Key of the pose, cached since keys() is a call into minisam
+        self._key0 = self.keys()[0]
 
     def copy(self):
-        return MMPriorFactor(self.keys()[0],
+        return MMPriorFactor(self._key0,
                              self.prior_pose,
                              self.switch_flag,
                              self.config,
@@ -72,7 +74,7 @@ class MMPriorFactor(Factor):
     def error(self, variables):
         prior_theta = self.prior_pose.so2().theta()
 
-        curr_pose = variables.at(self.keys()[0])
+        curr_pose = variables.at(self._key0)
         curr_loc_x = curr_pose.translation()[0]
         curr_loc_y = curr_pose.translation()[1]
         curr_theta = curr_pose.so2().theta()
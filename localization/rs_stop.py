@@ -3,7 +3,6 @@
 import math
 
 import numpy as np
-from scipy.stats import chi2
 from minisam import Factor, DiagonalLoss
 
 from carlasim.utils import get_fbumper_location
@@ -58,9 +57,11 @@ class RSStopFactor(Factor):
             [self.config['stddev_dist']]))
 
         Factor.__init__(self, 1, [key], loss)
+        # Key of the pose, cached since keys() is a call into minisam
+        self._key0 = self.keys()[0]
 
     def copy(self):
-        return RSStopFactor(self.keys()[0],
+        return RSStopFactor(self._key0,
                             self.detected_rs_stop_dist,
                             self.z,
                             self.pose_uncert,
@@ -68,7 +69,7 @@ class RSStopFactor(Factor):
 
     def error(self, variables):
         ########## Expectation ##########
-        pose = variables.at(self.keys()[0])
+        pose = variables.at(self._key0)
 
         # Append 0 as z since this factor is in 2D space
         location = np.append(pose.translation(), self.z)
@@ -0,0 +1,104 @@
+# Run it from project root with: python -m unittest localization.test.test_lane
+
+import math
+import unittest
+from types import SimpleNamespace
+import numpy as np
+
+import localization.lane as lane
+
+# Distance from rear axle to front bumper used in all tests
+PX = 2.
+
+# c1 near 0 and large |c1| are included on purpose
+C1S = np.array([0., 1e-9, -1e-9, 1e-4, -1e-4, 0.1, -0.3, 1., -2., 20., -50., 100.])
+C0S = np.random.default_rng(0).uniform(-5., 5., size=C1S.shape[0])
+
+
+class TestComputeHBatched(unittest.TestCase):
+    def test_hand_computed(self):
+        # h13 = c0*c1 - px, h23 = -(1 + c1^2)
+        H = lane.compute_H_batched(PX, np.array([1.]), np.array([0.5]))
+        np.testing.assert_allclose(H[0], [[0.5, -1., -1.5],
+                                          [0., 0., -1.25]])
+
+    def test_against_scalar(self):
+        H = lane.compute_H_batched(PX, C0S, C1S)
+        for c0, c1, H_single in zip(C0S, C1S, H):
+            np.testing.assert_allclose(H_single, lane.compute_H(PX, c0, c1))
+
+
+class TestExpectedC0C1Batched(unittest.TestCase):
+    def setUp(self):
+        # The method only needs px from the factor
+        self.factor = SimpleNamespace(px=PX)
+
+    def compute(self, normal_forms, pose_diff):
+        return lane.LaneBoundaryFactor._compute_expected_c0c1_batched(
+            self.factor, np.asarray(normal_forms, dtype=np.float64), pose_diff)
+
+    def test_hand_computed(self):
+        # Line y = 1 parallel to the x-axis, i.e. a = 0, b = 1, c = 1, and tan(alpha) = 0
+        normal_forms = [[0., 1., 1., 0.]]
+        # Moving 0.5 m to the left brings the line 0.5 m closer
+        np.testing.assert_allclose(self.compute(normal_forms, (3., 0.5, 0.)), [[0.5, 0.]])
+        # Rotating by dtheta moves the front bumper to (px*cos, px*sin), and the line
+        # is hit along the new y-axis at (1 - px*sin) / cos
+        dtheta = 0.1
+        np.testing.assert_allclose(self.compute(normal_forms, (0., 0., dtheta)),
+                                   [[(1 - PX*math.sin(dtheta))/math.cos(dtheta), -math.tan(dtheta)]])
+
+    def test_no_pose_diff(self):
+        # Without pose difference, the coefficients of the snapshot are recovered
+        normal_forms = [lane.compute_normal_form_line_coeffs(PX, c0, c1)[:3] + (c1,)
+                        for c0, c1 in zip(C0S, C1S)]
+        np.testing.assert_allclose(self.compute(normal_forms, (0., 0., 0.)),
+                                   np.stack((C0S, C1S), axis=1), rtol=1e-9, atol=1e-9)
+
+    def test_against_scalar(self):
+        scalar_normal_forms = [lane.compute_normal_form_line_coeffs(PX, c0, c1)
+                               for c0, c1 in zip(C0S, C1S)]
+        # The batched version takes tan(alpha), which equals c1, instead of alpha
+        normal_forms = [(a, b, c, c1) for (a, b, c, _), c1 in zip(scalar_normal_forms, C1S)]
+        for pose_diff in [(0.3, -0.2, 1e-6), (-1., 0.5, 0.2), (2., 1., -0.3)]:
+            expected_coeffs = self.compute(normal_forms, pose_diff)
+            for normal_form, coeffs in zip(scalar_normal_forms, expected_coeffs):
+                c0, c1 = lane.GNNLaneBoundaryFactor._compute_expected_c0c1(
+                    self.factor, normal_form, pose_diff)
+                np.testing.assert_allclose(coeffs, (c0, c1), rtol=1e-9, atol=1e-9)
+
+
+class TestComputeInnovsBatched(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.H = lane.compute_H_batched(PX, C0S, C1S)
+
+    def test_hand_computed(self):
+        # c0 = c1 = 0 gives H = [[0, -1, -px], [0, 0, -1]]
+        H = lane.compute_H_batched(PX, np.array([0.]), np.array([0.]))
+        innovs = lane.compute_innovs_batched(H, np.diag([1., 2., 3.]), np.diag([0.1, 0.2]))
+        np.testing.assert_allclose(innovs[0], [[2. + 4.*3. + 0.1, 6.],
+                                               [6., 3. + 0.2]])
+
+    def test_against_dense(self):
+        for _ in range(5):
+            A = self.rng.normal(size=(3, 3))
+            pose_uncert = A @ A.T
+            B = self.rng.normal(size=(2, 2))
+            noise_cov = B @ B.T
+            innovs = lane.compute_innovs_batched(self.H, pose_uncert, noise_cov)
+            for H_single, innov in zip(self.H, innovs):
+                np.testing.assert_allclose(innov, H_single @ pose_uncert @ H_single.T + noise_cov,
+                                           rtol=1e-10, atol=1e-10)
+
+    def test_non_symmetric(self):
+        pose_uncert = self.rng.normal(size=(3, 3))
+        noise_cov = self.rng.normal(size=(2, 2))
+        innovs = lane.compute_innovs_batched(self.H, pose_uncert, noise_cov)
+        np.testing.assert_allclose(innovs,
+                                   self.H @ pose_uncert @ self.H.transpose(0, 2, 1) + noise_cov,
+                                   rtol=1e-10, atol=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# Run it from project root with: python -m unittest localization.test.test_utils
+
+import math
+import unittest
+import numpy as np
+from scipy.stats import multivariate_normal
+
+from localization.utils import bivariate_normal_pdf
+
+
+class TestBivariateNormalPdf(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def random_cov(self):
+        A = self.rng.normal(size=(2, 2))
+        return A @ A.T + np.eye(2)*0.1
+
+    def test_hand_computed(self):
+        # Standard normal at the mean: 1 / (2*pi)
+        self.assertAlmostEqual(bivariate_normal_pdf(np.zeros(2), np.eye(2)), 1/(2*math.pi))
+        # Diagonal covariance: product of two univariate densities
+        cov = np.diag([4., 0.25])
+        expected = (math.exp(-0.5 * 1.**2/4.) / math.sqrt(2*math.pi*4.)
+                    * math.exp(-0.5 * 0.5**2/0.25) / math.sqrt(2*math.pi*0.25))
+        self.assertAlmostEqual(bivariate_normal_pdf(np.array([1., 0.5]), cov), expected)
+
+    def test_single(self):
+        for _ in range(20):
+            cov = self.random_cov()
+            x_m = self.rng.normal(size=2)
+            self.assertAlmostEqual(bivariate_normal_pdf(x_m, cov),
+                                   multivariate_normal.pdf(x_m, cov=cov))
+
+    def test_batched(self):
+        covs = np.array([self.random_cov() for _ in range(20)])
+        x_ms = self.rng.normal(size=(20, 2))
+        expected = [multivariate_normal.pdf(x_m, cov=cov) for x_m, cov in zip(x_ms, covs)]
+        np.testing.assert_allclose(bivariate_normal_pdf(x_ms, covs), expected, rtol=1e-10)
+
+    def test_shared_cov(self):
+        cov = self.random_cov()
+        x_ms = self.rng.normal(size=(20, 2))
+        np.testing.assert_allclose(bivariate_normal_pdf(x_ms, cov),
+                                   multivariate_normal.pdf(x_ms, cov=cov), rtol=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
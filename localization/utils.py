@@ -48,6 +48,27 @@ def multivariate_normal_pdf(x_m, cov):
             * np.exp(-(np.linalg.solve(cov, x_m).T.dot(x_m)) / 2))
 
 
+def bivariate_normal_pdf(x_m, cov):
+    """PDF of the bivariate normal distribution.
+
+    The 2-by-2 determinant and inverse are expanded in closed form, so this
+    avoids the overhead of numpy's linear algebra routines on tiny matrices.
+    It broadcasts over leading dimensions, so multiple densities can be
+    evaluated at once.
+
+    Args:
+        x_m: Quantiles with the last dimension of length 2.
+        cov: Covariance matrix with the last two dimensions of shape 2-by-2.
+    Returns:
+        Probability density.
+    """
+    a, b, c, d = cov[..., 0, 0], cov[..., 0, 1], cov[..., 1, 0], cov[..., 1, 1]
+    e0, e1 = x_m[..., 0], x_m[..., 1]
+    det = a*d - b*c
+    squared_mahala_dist = (d*e0*e0 - (b+c)*e0*e1 + a*e1*e1) / det
+    return np.exp(-0.5*squared_mahala_dist) / (2*np.pi*np.sqrt(det))
+
+
 class ExpectedLaneExtractor(object):
     """Class for expected lane detection extraction.
 
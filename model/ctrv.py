@@ -35,17 +35,20 @@ def predict_motion_from_ego_frame(vx, yaw_rate, delta_t, Q=None):
     if yaw_rate > 1e-3:
         yaw_rate_T = yaw_rate * delta_t
         r = vx/yaw_rate
-        delta_x = r * np.sin(yaw_rate_T)
-        delta_y = r * (-np.cos(yaw_rate_T) + 1)
+        # Scalar trigonometric functions from math are much faster than numpy's ones
+        # They are evaluated only once and reused below
+        sin_yaw_rate_T = sin(yaw_rate_T)
+        cos_yaw_rate_T = cos(yaw_rate_T)
+        one_minus_cos = 1 - cos_yaw_rate_T
+        delta_x = r * sin_yaw_rate_T
+        delta_y = r * one_minus_cos
         delta_theta = yaw_rate_T
 
         if Q is not None:
-            L[0, 0] = 1/yaw_rate * np.sin(yaw_rate_T)
-            L[0, 1] = -r/yaw_rate * \
-                np.sin(yaw_rate_T) + r*delta_t*np.cos(yaw_rate_T)
-            L[1, 0] = 1/yaw_rate * (-np.cos(yaw_rate_T) + 1)
-            L[1, 1] = -r/yaw_rate * \
-                (-np.cos(yaw_rate_T) + 1) + r*delta_t*np.sin(yaw_rate_T)
+            L[0, 0] = sin_yaw_rate_T / yaw_rate
+            L[0, 1] = -r/yaw_rate * sin_yaw_rate_T + r*delta_t*cos_yaw_rate_T
+            L[1, 0] = one_minus_cos / yaw_rate
+            L[1, 1] = -r/yaw_rate * one_minus_cos + r*delta_t*sin_yaw_rate_T
             L[2, 1] = delta_t
     else:
         delta_x = vx*delta_t
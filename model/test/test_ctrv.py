@@ -1,6 +1,7 @@
 # Run it from project root with: python -m unittest model.test.test_ctrv
 
 import unittest
+import numpy as np
 import model.ctrv as ctrv
 
 class TestCTRV(unittest.TestCase):
@@ -25,5 +26,17 @@ class TestCTRV(unittest.TestCase):
         self.assertAlmostEqual(dtheta, 0.)
         self.assertIsNone(cov)
 
+    def test_predict_motion_from_ego_frame_cov(self):
+        Q = np.diag([0.1**2, 0.01**2])
+        _, _, _, cov = ctrv.predict_motion_from_ego_frame(10, 0.5, 0.1, Q)
+        # Compare with Jacobian obtained by central differences
+        eps = 1e-6
+        L = np.empty((3, 2))
+        for col, (d_vx, d_yaw_rate) in enumerate(((eps, 0), (0, eps))):
+            plus = ctrv.predict_motion_from_ego_frame(10+d_vx, 0.5+d_yaw_rate, 0.1)[0:3]
+            minus = ctrv.predict_motion_from_ego_frame(10-d_vx, 0.5-d_yaw_rate, 0.1)[0:3]
+            L[:, col] = (np.asarray(plus) - np.asarray(minus)) / (2*eps)
+        np.testing.assert_allclose(cov, L @ Q @ L.T + np.eye(3)*1e-4, rtol=1e-6, atol=1e-10)
+
 if __name__ is '__main__':
     unittest.main()
\ No newline at end of file
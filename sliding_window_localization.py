@@ -13,6 +13,11 @@ import random
 
 import yaml
 import numpy as np
+import matplotlib
+# The backend must be chosen before pyplot is imported
+# Agg renders offscreen and skips all GUI event handling
+if '--headless' in sys.argv:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import imageio
 import pygame
@@ -43,6 +48,28 @@ def dir_path(path):
             f"readable_dir: {path} is not a valid path")
 
 
+def gen_spoke_line_pts(center_x, center_y, pts):
+    """Generate points of a polyline that goes back and forth between the center and every point.
+
+    Args:
+        center_x: x coordinate of the center.
+        center_y: y coordinate of the center.
+        pts: 2-by-N array of points.
+
+    Returns:
+        line_pts_x: x coordinates of the polyline in the form of [center, pt_1, center, pt_2, ...].
+        line_pts_y: y coordinates of the polyline.
+    """
+    num_pts = pts.shape[1]
+    line_pts_x = np.empty(2*num_pts+1)
+    line_pts_y = np.empty(2*num_pts+1)
+    line_pts_x[0::2] = center_x
+    line_pts_y[0::2] = center_y
+    line_pts_x[1::2] = pts[0]
+    line_pts_y[1::2] = pts[1]
+    return line_pts_x, line_pts_y
+
+
 def main():
     """Main function"""
     ############### Parse arguments ###############
@@ -61,8 +88,29 @@ def main():
                            help='save results in SAVE_DIR under the recording folder')
     argparser.add_argument('-ve', '--vis_error', default=False, action='store_true',
                            help='Visualize resulting errors')
+    argparser.add_argument('-g', '--gif', default=False, action='store_true',
+                           help='save animation of localization as .gif in SAVE_DIR')
+    argparser.add_argument('--gif_stride', type=int, default=1,
+                           help='capture every GIF_STRIDE-th step for the .gif')
+    argparser.add_argument('--no_display', dest='display', default=True, action='store_false',
+                           help='do not display the animation of localization')
+    argparser.add_argument('--headless', default=False, action='store_true',
+                           help='render offscreen without any window (implies --no_display)')
     args = argparser.parse_args()
 
+    # The .gif is saved in SAVE_DIR, so it cannot be made without it
+    if args.gif and not args.save_dir:
+        argparser.error('--gif requires --save')
+    if args.gif_stride < 1:
+        argparser.error('--gif_stride must be at least 1')
+
+    # Error plots cannot be shown in headless mode, so they must be saved in SAVE_DIR
+    if args.headless and args.vis_error and not args.save_dir:
+        argparser.error('--headless with --vis_error requires --save')
+
+    if args.headless:
+        args.display = False
+
     # Load data in the recording folder
     with open(os.path.join(args.recording_dir, 'sensor_data.pkl'), 'rb') as f:
         sensor_data = pickle.load(f)
@@ -103,13 +151,20 @@ def main():
     traffic_signs = gt_data['static']['traffic_sign']
 
     # Sensor data
-    timestamp_seq = sensor_data['gnss']['timestamp']
-    gnss_x_seq = sensor_data['gnss']['x']
-    gnss_y_seq = sensor_data['gnss']['y']
-    gnss_z_seq = sensor_data['gnss']['z']
+    # Converted to arrays once so that indexing in the loop is cheap
+    timestamp_seq = np.asarray(sensor_data['gnss']['timestamp'], dtype=np.float64)
+    gnss_x_seq = np.asarray(sensor_data['gnss']['x'], dtype=np.float64)
+    gnss_y_seq = np.asarray(sensor_data['gnss']['y'], dtype=np.float64)
+    gnss_z_seq = np.asarray(sensor_data['gnss']['z'], dtype=np.float64)
 
-    vx_seq = sensor_data['imu']['vx']
-    gyro_z_seq = sensor_data['imu']['gyro_z']
+    vx_seq = np.asarray(sensor_data['imu']['vx'], dtype=np.float64)
+    gyro_z_seq = np.asarray(sensor_data['imu']['gyro_z'], dtype=np.float64)
+
+    # Time differences between consecutive steps
+    # The first element is never used since localization starts after pre init phase
+    delta_ts = np.empty_like(timestamp_seq)
+    delta_ts[0] = 0.
+    delta_ts[1:] = np.diff(timestamp_seq)
 
     # Simulated detections
     lane_detection_seq = detections['lane']
@@ -124,25 +179,37 @@ def main():
     init_idx = localization_config['init_idx']
     end_idx = localization_config['end_idx']
 
-    ############### Connect to Carla server ###############
-    client = carla.Client('localhost', 2000)
-    client.set_timeout(3.0)
-    carla_world = client.load_world(carla_config['world']['map'])
-
-    settings = carla_world.get_settings()
-    settings.synchronous_mode = True
-    settings.fixed_delta_seconds = 0.1
-    settings.no_rendering_mode = True
-    carla_world.apply_settings(settings)
-
-    ############### Load map image ###############
+    # Paths to the cached map image and its info
     dirname = os.path.join("cache", "map_images")
     filename = carla_config['world']['map'] + '.jpg'
     full_path = str(os.path.join(dirname, filename))
+    info_filename = carla_config['world']['map'] + '_info.yaml'
+    info_full_path = str(os.path.join(dirname, info_filename))
+    map_image_cached = os.path.isfile(full_path) and os.path.isfile(info_full_path)
+
+    ############### Connect to Carla server ###############
+    # Carla is only needed for querying lane ground truth and rendering the map image.
+    # Connecting and loading a world takes long, so it is skipped if neither is needed.
+    if localization_config['use_lane'] or not map_image_cached:
+        client = carla.Client('localhost', 2000)
+        client.set_timeout(3.0)
+        carla_world = client.load_world(carla_config['world']['map'])
+
+        settings = carla_world.get_settings()
+        settings.synchronous_mode = True
+        settings.fixed_delta_seconds = 0.1
+        settings.no_rendering_mode = True
+        carla_world.apply_settings(settings)
+    else:
+        carla_world = None
 
+    ############### Load map image ###############
     # If map image does not exist, create it
-    if not os.path.isfile(full_path):
+    if not map_image_cached:
         # pygame is needed for map rendering
+        if args.headless:
+            # Render without a window
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
         pygame.init()
         display = pygame.display.set_mode(
             (600, 200),
@@ -172,8 +239,6 @@ def main():
     map_image = plt.imread(full_path)
 
     # Load map info of how to show a pose on the map image
-    info_filename = carla_config['world']['map'] + '_info.yaml'
-    info_full_path = str(os.path.join(dirname, info_filename))
     with open(info_full_path, 'r') as f:
         map_info = yaml.safe_load(f)
 
@@ -188,10 +253,13 @@ def main():
     loc_y_gts = location_gt[:, 1]
 
     # Retrieve pole ground truth
-    sign_pole_coords = np.array([[pole.x, pole.y] for pole in pole_map if (
-        pole.type != TrafficSignType.Unknown and pole.type != TrafficSignType.RSStop)])
-    general_pole_coords = np.array([[pole.x, pole.y] for pole in pole_map if
-                                    pole.type == TrafficSignType.Unknown])
+    # Coordinates and types of all poles are gathered in one pass and then split by masks
+    pole_coords = np.array([[pole.x, pole.y] for pole in pole_map])
+    pole_types = np.array([pole.type.value for pole in pole_map])
+    is_general_pole = pole_types == TrafficSignType.Unknown.value
+    is_sign_pole = ~is_general_pole & (pole_types != TrafficSignType.RSStop.value)
+    sign_pole_coords = pole_coords[is_sign_pole]
+    general_pole_coords = pole_coords[is_general_pole]
 
     # Path ground truth
     gt_path = ax.plot(loc_x_gts, loc_y_gts, '-o', ms=2)
@@ -220,7 +288,8 @@ def main():
     ax.set_xlabel('x [m]')
     ax.set_ylabel('y [m]')
 
-    plt.show(block=False)
+    if args.display:
+        plt.show(block=False)
 
     ############### Sliding window graph ###############
     # Expected measurement extractors must be created in advance and given to
@@ -229,10 +298,14 @@ def main():
 
     # ExpectedLaneExtractor uses a LaneGTExtractor internally to do the queries.
     # Note: The extracted lane boundaries are wrt the query point.
-    lane_gt_extractor = LaneGTExtractor(carla_world,
-                                        localization_config['gt_extract']['lane_gt_extractor'],
-                                        debug=False)
-    expected_lane_extractor = ExpectedLaneExtractor(lane_gt_extractor)
+    if localization_config['use_lane']:
+        lane_gt_extractor = LaneGTExtractor(carla_world,
+                                            localization_config['gt_extract']['lane_gt_extractor'],
+                                            debug=False)
+        expected_lane_extractor = ExpectedLaneExtractor(lane_gt_extractor)
+    else:
+        # No lane boundary factor is added, so lane ground truth is never queried
+        expected_lane_extractor = None
 
     # ExpectedPoleExtractor extracts map poles given query points.
     # Note: The extracted poles are wrt the world frame. Transformation
@@ -255,31 +328,101 @@ def main():
                                          first_node_idx=init_idx)
 
     ############### Loop through recorded data ###############
+    # Steps to be processed. Steps after end_idx are not used.
+    first_loop_idx = max(pre_init_idx, 0)
+    last_loc_idx = min(end_idx, timestamp_seq.shape[0]-1)
+    # bool: True if the init step is processed in the loop
+    init_in_loop = first_loop_idx <= init_idx <= last_loc_idx
+
     # Fix the seed for post-added noise
     if args.noise_config:
         np.random.seed(post_noise_config['seed'])
         # Perturbation of detecion types is based on random package
         random.seed(post_noise_config['seed'])
 
+        # Pre-sample noise from np.random for all steps at once.
+        # Standard normal draws are laid out in the same order as if they were drawn step by step,
+        # so results with the same seed are the same as drawing them one at a time.
+        # The draws of a step are vx, yaw rate, gnss x, y, z, rs stop distance (only if detected),
+        # and initial yaw (only at init_idx if it is processed).
+        # Element i of the following arrays is for the step first_loop_idx + i
+        has_rs_stop = np.array([rs_stop_detection_seq[idx] is not None
+                                for idx in range(first_loop_idx, last_loc_idx+1)])
+        num_draws = 5 + has_rs_stop.astype(int)
+        if init_in_loop:
+            num_draws[init_idx-first_loop_idx] += 1
+        draw_offsets = np.cumsum(num_draws) - num_draws
+        std_normal_draws = np.random.standard_normal(num_draws.sum())
+
+        odom_noise_config = post_noise_config['odom']
+        odom_noise = (std_normal_draws[draw_offsets[:, np.newaxis] + [0, 1]]
+                      * [odom_noise_config['v_stddev'], odom_noise_config['yaw_rate_stddev']]
+                      + [odom_noise_config['v_bias'], odom_noise_config['yaw_rate_bias']])
+        gnss_noise_config = post_noise_config['gnss']
+        gnss_noise = (std_normal_draws[draw_offsets[:, np.newaxis] + [2, 3, 4]]
+                      * [gnss_noise_config['x_stddev'],
+                         gnss_noise_config['y_stddev'],
+                         gnss_noise_config['z_stddev']]
+                      + [gnss_noise_config['x_bias'],
+                         gnss_noise_config['y_bias'],
+                         gnss_noise_config['z_bias']])
+        rs_stop_noise = np.zeros(has_rs_stop.shape[0])
+        rs_stop_noise[has_rs_stop] = (std_normal_draws[draw_offsets[has_rs_stop] + 5]
+                                      * post_noise_config['rs_stop']['dist_stddev']
+                                      + post_noise_config['rs_stop']['dist_bias'])
+        if init_in_loop:
+            init_yaw_draw_idx = draw_offsets[init_idx-first_loop_idx] + num_draws[init_idx-first_loop_idx] - 1
+            init_yaw_noise = std_normal_draws[init_yaw_draw_idx] * 0.1
+
     # Lists for pre init phase
     init_gnss_x = []
     init_gnss_y = []
 
-    # List for storing pose of each time step after optimization
-    pose_estimations = []
+    # Array for storing pose [x, y, theta] of each time step after optimization
+    # Row i holds the pose of the step init_idx + i
+    pose_estimations = np.empty((last_loc_idx - init_idx + 1, 3))
     # List for storing cpu time of solving the graph at each cycle
     cpu_times = []
 
     if args.save_dir:
-        # List for storing figures
-        gif_image_seq = []
-
-    for idx, timestamp in enumerate(timestamp_seq):
-
-        if idx < pre_init_idx:
-            continue
+        # Get full dir under the recording dir and create it if not exist
+        full_save_dir = os.path.join(args.recording_dir,
+                                     'results',
+                                     args.save_dir)
+        Path(full_save_dir).mkdir(parents=True, exist_ok=True)
 
-        delta_t = timestamp - timestamp_seq[idx-1]
+    # Capturing frames is costly, so the .gif is only made on request
+    save_gif = args.gif
+    if save_gif:
+        # Frames are streamed into the .gif file instead of being kept in memory
+        gif_path = os.path.join(full_save_dir, 'localization.gif')
+        gif_writer = imageio.get_writer(gif_path, mode='I', fps=10)
+
+    # Coordinates of the front bumper and the camera in ego frame
+    # The front bumper frame has the same orientation as the ego frame
+    fbumper_coord_ego = np.array([dist_raxle_to_fbumper, 0.])
+    cam_coord_ego = np.array([dist_raxle_to_cam, 0.])
+
+    # Buffer of lane boundary points to visualize wrt front bumper
+    # x coordinates are fixed, and y coordinates are overwritten at every step
+    lb_x = np.linspace(0, 10, 10)
+    lb_pts_fbumper = np.empty((2, lb_x.shape[0]))
+    lb_pts_fbumper[0] = lb_x
+
+    # Covariance ellipses are drawn for every cov_stride-th pose in the window
+    cov_stride = 5
+    # Pairs of artists (triangle, ellipse) for poses in the window
+    pose_plots = []
+    # Image coordinate of the last cropped map image
+    prev_image_coord = None
+
+    # Traffic sign types used to split pole detections for visualization
+    # Enum members are singletons, so they can be compared by identity
+    unknown_type = TrafficSignType.Unknown
+    rs_stop_type = TrafficSignType.RSStop
+
+    for idx in range(first_loop_idx, last_loc_idx+1):
+        delta_t = delta_ts[idx]
 
         # Retrieve odom from last time step
         vx = vx_seq[idx-1]
@@ -295,26 +438,15 @@ def main():
 
         # Add noise if noise configurations are given
         if args.noise_config:
+            noise_idx = idx - first_loop_idx
             # Odom
-            v_bias = post_noise_config['odom']['v_bias']
-            v_stddev = post_noise_config['odom']['v_stddev']
-            yaw_rate_bias = post_noise_config['odom']['yaw_rate_bias']
-            yaw_rate_stddev = post_noise_config['odom']['yaw_rate_stddev']
-
-            vx += np.random.normal(v_bias, v_stddev)
-            yaw_rate += np.random.normal(yaw_rate_bias, yaw_rate_stddev)
+            vx += odom_noise[noise_idx, 0]
+            yaw_rate += odom_noise[noise_idx, 1]
 
             # GNSS
-            x_bias = post_noise_config['gnss']['x_bias']
-            x_stddev = post_noise_config['gnss']['x_stddev']
-            y_bias = post_noise_config['gnss']['y_bias']
-            y_stddev = post_noise_config['gnss']['y_stddev']
-            z_bias = post_noise_config['gnss']['z_bias']
-            z_stddev = post_noise_config['gnss']['z_stddev']
-
-            gnss_x += np.random.normal(x_bias, x_stddev)
-            gnss_y += np.random.normal(y_bias, y_stddev)
-            gnss_z += np.random.normal(z_bias, z_stddev)
+            gnss_x += gnss_noise[noise_idx, 0]
+            gnss_y += gnss_noise[noise_idx, 1]
+            gnss_z += gnss_noise[noise_idx, 2]
 
             # Lane
             # False positives use a separate false classification probability
@@ -342,10 +474,8 @@ def main():
             # RS stop
             if rs_stop_detection is not None:
                 dist_scale = post_noise_config['rs_stop']['scale']
-                dist_bias = post_noise_config['rs_stop']['dist_bias']
-                dist_stddev = post_noise_config['rs_stop']['dist_stddev']
                 rs_stop_detection *= dist_scale
-                rs_stop_detection += np.random.normal(dist_bias, dist_stddev)
+                rs_stop_detection += rs_stop_noise[noise_idx]
 
         # Pre init phase
         # Add GNSS data to list to be averaged.
@@ -362,7 +492,10 @@ def main():
 
             # Use perturbed yaw to initialize heading
             yaw_gt = raxle_orientations[idx][2]
-            noised_yaw_gt = yaw_gt + np.random.normal(0.0, 0.1)
+            if args.noise_config:
+                noised_yaw_gt = yaw_gt + init_yaw_noise
+            else:
+                noised_yaw_gt = yaw_gt + np.random.normal(0.0, 0.1)
 
             sw_graph.add_prior_factor(
                 avg_gnss_x, avg_gnss_y, noised_yaw_gt)
@@ -393,10 +526,15 @@ def main():
 
             # Add pole factors
             if localization_config['use_pole']:
-                if pole_detection is not None:
-                    for detected_pole in pole_detection:
-                        if detected_pole.x < 50 and abs(detected_pole.y) < 25:
-                            sw_graph.add_pole_factor(detected_pole)
+                if pole_detection:
+                    # Only poles in the near front are used
+                    # The region is checked for all detections at once
+                    num_poles = len(pole_detection)
+                    pole_xs = np.fromiter((pole.x for pole in pole_detection), np.float64, num_poles)
+                    pole_ys = np.fromiter((pole.y for pole in pole_detection), np.float64, num_poles)
+                    in_region = (pole_xs < 50) & (np.abs(pole_ys) < 25)
+                    for pole_idx in np.flatnonzero(in_region):
+                        sw_graph.add_pole_factor(pole_detection[pole_idx])
 
             # Add rs stop factor
             if localization_config['use_rs_stop']:
@@ -415,12 +553,18 @@ def main():
             cpu_times.append(cpu_time)
 
             # Record the lastest pose after optimization
-            last_se2_pose = sw_graph.last_optimized_se2
-            # Make pose a list of [x, y, theta]
-            last_pose = [last_se2_pose.translation()[0],
-                         last_se2_pose.translation()[1],
-                         last_se2_pose.so2().theta()]
-            pose_estimations.append(last_pose)
+            # It is retrieved only once and reused for visualization below
+            last_se2 = sw_graph.last_optimized_se2
+            last_trans = last_se2.translation()
+            last_x = last_trans[0]
+            last_y = last_trans[1]
+            last_yaw = last_se2.so2().theta()
+            pose_estimations[idx-init_idx] = (last_x, last_y, last_yaw)
+
+            # Skip visualization if the current step is neither displayed nor captured
+            capture_frame = save_gif and (idx - init_idx) % args.gif_stride == 0
+            if not (args.display or capture_frame):
+                continue
 
             ##### Visualize current step #####
             half_width = 20  # (m) half width of background map
@@ -429,27 +573,48 @@ def main():
             ### background map ###
             # Get image coordinate of the latest pose on the map image
             image_coord = evtools.world_to_pixel(carla.Location(
-                last_pose[0], -last_pose[1]), map_info)
+                last_x, -last_y), map_info)
 
             # Crop the map image for display
-            local_map_image = map_image[image_coord[1]-half_width_px:image_coord[1]+half_width_px,
-                                        image_coord[0]-half_width_px:image_coord[0]+half_width_px]
+            # Updating the image data is costly, so skip it if the crop stays the same
+            if image_coord != prev_image_coord:
+                local_map_image = map_image[image_coord[1]-half_width_px:image_coord[1]+half_width_px,
+                                            image_coord[0]-half_width_px:image_coord[0]+half_width_px]
+                map_im.set_data(local_map_image)
+                prev_image_coord = image_coord
 
             # Paste the cropped map image to the correct place
-            left = last_pose[0] - half_width
-            right = last_pose[0] + half_width
-            bottom = last_pose[1] - half_width
-            top = last_pose[1] + half_width
-            map_im.set_data(local_map_image)
+            left = last_x - half_width
+            right = last_x + half_width
+            bottom = last_y - half_width
+            top = last_y + half_width
             map_im.set_extent([left, right, bottom, top])
 
             ### Visualize poses ###
-            pose_plots = []
-            for node_idx in sw_graph.get_idc_in_graph():
+            # Marginal covariances are only queried for every cov_stride-th pose counted
+            # from the latest one, since the ellipses of neighboring poses mostly overlap.
+            # The covariance of the latest pose is already solved in solve_one_step().
+            # Artists are reused across steps and only created when the window grows
+            node_idc = sw_graph.get_idc_in_graph()
+            last_node_idx = node_idc[-1]
+            for plot_idx, node_idx in enumerate(node_idc):
                 pose = sw_graph.get_result(node_idx)
-                cov = sw_graph.get_marignal_cov_matrix(node_idx)
-                pose_plots.append(evtools.plot_se2_with_cov(
-                    ax, pose, cov, ellip_color='k', confidence=0.999))
+                if node_idx == last_node_idx:
+                    cov = sw_graph.last_optimized_cov
+                elif (last_node_idx - node_idx) % cov_stride == 0:
+                    cov = sw_graph.get_marignal_cov_matrix(node_idx)
+                else:
+                    cov = None
+                if plot_idx < len(pose_plots):
+                    evtools.update_se2_with_cov(*pose_plots[plot_idx], pose, cov,
+                                                confidence=0.999)
+                else:
+                    pose_plots.append(evtools.plot_se2_with_cov(
+                        ax, pose, cov, ellip_color='k', confidence=0.999))
+            # Hide artists not used at this step
+            for triangle, ellipse in pose_plots[len(node_idc):]:
+                triangle.set_visible(False)
+                ellipse.set_visible(False)
 
             ### Visualize pose ground truth ###
             pose_gt_dot.set_data(
@@ -459,28 +624,19 @@ def main():
             gnss_dot.set_data(gnss_x, gnss_y)
 
             ### Visualize Lane boundary detection ###
-            last_se2 = sw_graph.last_optimized_se2
-            last_x = last_se2.translation()[0]
-            last_y = last_se2.translation()[1]
-            last_yaw = last_se2.so2().theta()
-            # Matrix to transform points in ego frame to world frame
-            tform_e2w = np.array([[math.cos(last_yaw), -math.sin(last_yaw), last_x],
-                                  [math.sin(last_yaw), math.cos(
-                                      last_yaw), last_y],
-                                  [0, 0, 1]])
-            # Matrix to transform points in front bumper to ego frame
-            tfrom_fbumper2raxel = np.array([[1, 0, dist_raxle_to_fbumper],
-                                            [0, 1, 0],
-                                            [0, 0, 1]])
-            # Matrix to transform points in front bumper to world frame
-            tform_fbumper2w = tform_e2w @ tfrom_fbumper2raxel
-
-            lb_x = np.linspace(0, 10, 10)
+            # Rotation and translation to transform points in ego frame to world frame
+            cos_yaw = math.cos(last_yaw)
+            sin_yaw = math.sin(last_yaw)
+            rot_e2w = np.array([[cos_yaw, -sin_yaw],
+                                [sin_yaw, cos_yaw]])
+            trans_e2w = np.array([last_x, last_y])
+            # Translation to transform points in front bumper frame to world frame
+            # Column vector so that it can be added to 2-by-N points directly
+            trans_fbumper2w = (rot_e2w @ fbumper_coord_ego + trans_e2w)[:, np.newaxis]
+
             if lane_detection.left_marking_detection:
-                lb_y = lane_detection.left_marking_detection.compute_y(lb_x)
-                lb_pts_wrt_fbumper = np.array(
-                    [lb_x, lb_y, np.ones((lb_x.shape[0],))])
-                lb_pts_world = tform_fbumper2w @ lb_pts_wrt_fbumper
+                lb_pts_fbumper[1] = lane_detection.left_marking_detection.compute_y(lb_x)
+                lb_pts_world = rot_e2w @ lb_pts_fbumper + trans_fbumper2w
                 # Update plot
                 left_lb.set_data(lb_pts_world[0], lb_pts_world[1])
             else:
@@ -488,10 +644,8 @@ def main():
                 left_lb.set_data([], [])
 
             if lane_detection.right_marking_detection:
-                lb_y = lane_detection.right_marking_detection.compute_y(lb_x)
-                lb_pts_wrt_fbumper = np.array(
-                    [lb_x, lb_y, np.ones((lb_x.shape[0],))])
-                lb_pts_world = tform_fbumper2w @ lb_pts_wrt_fbumper
+                lb_pts_fbumper[1] = lane_detection.right_marking_detection.compute_y(lb_x)
+                lb_pts_world = rot_e2w @ lb_pts_fbumper + trans_fbumper2w
                 # Update plot
                 right_lb.set_data(lb_pts_world[0], lb_pts_world[1])
             else:
@@ -499,83 +653,66 @@ def main():
                 right_lb.set_data([], [])
 
             ### Visualize pole detection ###
-            cam_coord_world = tform_e2w @ np.array([dist_raxle_to_cam, 0, 1])
+            cam_coord_world = rot_e2w @ cam_coord_ego + trans_e2w
             cam_x_world = cam_coord_world[0]
             cam_y_world = cam_coord_world[1]
             if pole_detection:
+                # Split detections into traffic signs and general poles in one pass
+                # Road surface stop signs are not visualized here
+                sign_coords = []
+                pole_coords = []
+                for pole in pole_detection:
+                    if pole.type is unknown_type:
+                        pole_coords.append((pole.x, pole.y))
+                    elif pole.type is not rs_stop_type:
+                        sign_coords.append((pole.x, pole.y))
+
                 # Traffic signs
-                sign_coords_fbumper = np.array(
-                    [[pole.x, pole.y, 1] for pole in pole_detection if (
-                        pole.type != TrafficSignType.Unknown and
-                        pole.type != TrafficSignType.RSStop)]).T
+                sign_coords_fbumper = np.array(sign_coords).T
 
-                line_pts_x = [cam_x_world]
-                line_pts_y = [cam_y_world]
                 if sign_coords_fbumper.size:
-                    sign_coords_world = tform_fbumper2w @ sign_coords_fbumper
-                    for coord in sign_coords_world.T:
-                        line_pts_x.append(coord[0])
-                        line_pts_x.append(cam_x_world)
-                        line_pts_y.append(coord[1])
-                        line_pts_y.append(cam_y_world)
+                    sign_coords_world = rot_e2w @ sign_coords_fbumper + trans_fbumper2w
                     # Update plot
-                    sign_pole_plot.set_data(line_pts_x,
-                                            line_pts_y)
+                    sign_pole_plot.set_data(*gen_spoke_line_pts(cam_x_world, cam_y_world,
+                                                                sign_coords_world))
                 else:
                     # Update plot
-                    sign_pole_plot.set_data(line_pts_x, line_pts_y)
+                    sign_pole_plot.set_data([cam_x_world], [cam_y_world])
 
                 # General poles
-                pole_coords_fbumper = np.array(
-                    [[pole.x, pole.y, 1] for pole in pole_detection if
-                        pole.type == TrafficSignType.Unknown]).T
+                pole_coords_fbumper = np.array(pole_coords).T
 
-                line_pts_x = [cam_x_world]
-                line_pts_y = [cam_y_world]
                 if pole_coords_fbumper.size:
-                    pole_coords_world = tform_fbumper2w @ pole_coords_fbumper
-                    for coord in pole_coords_world.T:
-                        line_pts_x.append(coord[0])
-                        line_pts_x.append(cam_x_world)
-                        line_pts_y.append(coord[1])
-                        line_pts_y.append(cam_y_world)
+                    pole_coords_world = rot_e2w @ pole_coords_fbumper + trans_fbumper2w
                     # Update plot
-                    general_pole_plot.set_data(line_pts_x,
-                                               line_pts_y)
+                    general_pole_plot.set_data(*gen_spoke_line_pts(cam_x_world, cam_y_world,
+                                                                   pole_coords_world))
                 else:
-                    general_pole_plot.set_data(line_pts_x, line_pts_y)
+                    general_pole_plot.set_data([cam_x_world], [cam_y_world])
             else:
                 # Update plot
                 sign_pole_plot.set_data([], [])
                 general_pole_plot.set_data(cam_x_world, cam_y_world)
 
             ax.set_title(idx)
-            plt.pause(0.001)
-
-            if args.save_dir:
-                image = np.frombuffer(fig.canvas.tostring_rgb(), dtype='uint8')
-                image = image.reshape(
-                    fig.canvas.get_width_height()[::-1] + (3,))
-                gif_image_seq.append(image)
 
-            # Remove artists for poses
-            for triangle, ellipse in pose_plots:
-                triangle.remove()
-                ellipse.remove()
+            if capture_frame:
+                # Draw the canvas right away so its buffer holds the current step
+                fig.canvas.draw()
+                # Take RGB channels from the RGBA buffer of the drawn canvas
+                # A copy is needed since the buffer is reused by the canvas
+                image = np.asarray(fig.canvas.buffer_rgba())[:, :, :3].copy()
+                gif_writer.append_data(image)
+            elif args.display:
+                fig.canvas.draw_idle()
 
-            if idx >= end_idx:
-                break
+            if args.display:
+                # Process GUI events without plt.pause(), which sleeps and redraws at every step
+                fig.canvas.flush_events()
 
-    # Save .gif if a folder is specified
-    if args.save_dir:
-        # Get full dir under the recording dir and create it if not exist
-        full_save_dir = os.path.join(args.recording_dir,
-                                     'results',
-                                     args.save_dir)
-        Path(full_save_dir).mkdir(parents=True, exist_ok=True)
-        # Save gif
-        gif_path = os.path.join(full_save_dir, 'localization.gif')
-        imageio.mimsave(gif_path, gif_image_seq, fps=10)
+    # Finish .gif if requested
+    if save_gif:
+        gif_writer.close()
 
     ############### Evaluation ###############
     #### Compute errors ####
@@ -588,14 +725,17 @@ def main():
         localization_results['loc_gt_seq'] = loc_gt_seq
         localization_results['ori_gt_seq'] = ori_gt_seq
         localization_results['pose_estimations'] = pose_estimations
-        localization_results['cpu_times'] = cpu_times
+        # Store sequences of numbers as arrays so they are pickled as contiguous buffers
+        localization_results['cpu_times'] = np.asarray(cpu_times)
         localization_results['lon_errs'] = lon_errs
         localization_results['lat_errs'] = lat_errs
         localization_results['yaw_errs'] = yaw_errs
 
         result_data_pth = os.path.join(full_save_dir, 'results.pkl')
         with open(result_data_pth, 'wb') as f:
-            pickle.dump(localization_results, f)
+            # Protocol 5 (Python 3.8+) handles large buffers more efficiently
+            pickle.dump(localization_results, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
 
         # Copy pose_noise.yaml for later reference
         post_noise_file_path = os.path.join(full_save_dir, 'post_noise.yaml')
@@ -608,9 +748,9 @@ def main():
 
 
     # Absolute errors
-    abs_lon_errs = np.abs(np.asarray(lon_errs))
-    abs_lat_errs = np.abs(np.asarray(lat_errs))
-    abs_yaw_errs = np.abs(np.asarray(yaw_errs))
+    abs_lon_errs = np.abs(lon_errs)
+    abs_lat_errs = np.abs(lat_errs)
+    abs_yaw_errs = np.abs(yaw_errs)
 
     plt.close('all')
     
@@ -625,28 +765,25 @@ def main():
         local_map_image, extent = evtools.get_local_map_image(
             loc_gt_seq, map_image, map_info, pose_estimations=pose_estimations)
 
-        # Longitudinal error #
-        lon_err_fig, lon_err_ax = evtools.gen_colored_error_plot('Abs. Longitudinal Error (m)',
-                                                                abs_lon_errs, 3.0,
-                                                                loc_gt_seq, pose_estimations,
-                                                                sign_pole_coords, general_pole_coords,
-                                                                local_map_image, extent)
-
-        # Longitudinal error #
-        lat_err_fig, lat_err_ax = evtools.gen_colored_error_plot('Abs. Lateral Error (m)',
-                                                                abs_lat_errs, 1.0,
-                                                                loc_gt_seq, pose_estimations,
-                                                                sign_pole_coords, general_pole_coords,
-                                                                local_map_image, extent)
-
-        # Yaw error ##
-        yaw_err_fig, yaw_err_ax = evtools.gen_colored_error_plot('Abs. Yaw Error (rad)',
-                                                                abs_yaw_errs, 0.5,
-                                                                loc_gt_seq, pose_estimations,
-                                                                sign_pole_coords, general_pole_coords,
-                                                                local_map_image, extent)
-
-        plt.show()
+        # Path segments are shared by all error plots
+        segments = evtools.gen_path_segments(pose_estimations)
+
+        # Title, absolute errors, upper bound of the color map, and file name of each error plot
+        error_plot_configs = [('Abs. Longitudinal Error (m)', abs_lon_errs, 3.0, 'lon_err'),
+                              ('Abs. Lateral Error (m)', abs_lat_errs, 1.0, 'lat_err'),
+                              ('Abs. Yaw Error (rad)', abs_yaw_errs, 0.5, 'yaw_err')]
+        for title, abs_errs, upper_bound, fig_name in error_plot_configs:
+            err_fig, _ = evtools.gen_colored_error_plot(title, abs_errs, upper_bound,
+                                                        loc_gt_seq, pose_estimations,
+                                                        sign_pole_coords, general_pole_coords,
+                                                        local_map_image, extent, segments=segments)
+            # Figures cannot be shown in headless mode, so save them instead
+            if args.headless:
+                err_fig.savefig(os.path.join(full_save_dir, fig_name + '.svg'),
+                                bbox_inches='tight')
+
+        if not args.headless:
+            plt.show()
 
 
 if __name__ == "__main__":